@@ -4,16 +4,35 @@ import time
 import requests
 import json
 import re
+import hashlib
+from datetime import datetime
 from typing import Dict, List, Optional, Any, Union
 from functools import wraps
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
 from enum import Enum
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
+from urllib3.exceptions import ReadTimeoutError
 from services.openrouter_service import OpenRouterService
+from services.http_client import PooledHTTPClient
+from services.result_cache import TTLCache
+from services.single_flight import SingleFlight
+from services.shared_cache import SQLiteCache, TieredCache
+from services.fanout import AsyncFanout
+from services.deadline import Deadline, DeadlineExceeded
+from services.hedging import HedgedCaller
+from services.gazetteer import gazetteer
+from services.query_parser import analyze_query
+from services.speculation import SpeculativeRunner
+from services.property_filter import PropertyFilter
+from services.property_batch import PropertyBatch
+from services.property_record import Property, serialize_properties
+from services.json_provider import FastJSONProvider
+from services.json_stream import JSONArrayNotFound, extract_json_array
+from services.pipeline import PipelineStats, TopKSink
+from services.rate_limiter import MonthlyUsage, RateLimitExceeded, SharedMonthlyUsage, SharedTokenBucket, TokenBucket, UpstreamRateLimiter
 
 # Load environment variables
 load_dotenv()
@@ -35,12 +54,82 @@ app = Flask(__name__)
 # Configure CORS for internal use (simplified security)
 CORS(app, origins="*")
 
-# Initialize services
-openrouter_service = OpenRouterService()
+# JSON responses are encoded with orjson when it is installed; set to
+# 'stdlib' to always use the standard library encoder
+RESPONSE_JSON_ENCODER = os.getenv('RESPONSE_JSON_ENCODER', 'orjson').lower()
+app.json = FastJSONProvider(app, use_orjson=RESPONSE_JSON_ENCODER == 'orjson')
 
 # RapidAPI Configuration
 RAPIDAPI_KEY = os.getenv('RAPIDAPI_KEY', 'd8dad7a0d0msh79d5e302536f59cp1e388bjsn65fdb4ba9233')
 RAPIDAPI_HOST = os.getenv('RAPIDAPI_HOST', 'airbnb19.p.rapidapi.com')
+RAPIDAPI_READ_TIMEOUT = float(os.getenv('RAPIDAPI_READ_TIMEOUT', 15))
+
+# RapidAPI responses are parsed as they stream in, this many bytes at a time
+RAPIDAPI_STREAM_CHUNK_SIZE = int(os.getenv('RAPIDAPI_STREAM_CHUNK_SIZE', 16 * 1024))
+
+# Optional hedging: re-send a RapidAPI call that is slower than the observed
+# latency percentile, bounded to a fraction of primary calls
+RAPIDAPI_HEDGING = os.getenv('RAPIDAPI_HEDGING', 'false').lower() == 'true'
+RAPIDAPI_HEDGE_PERCENTILE = float(os.getenv('RAPIDAPI_HEDGE_PERCENTILE', 95))
+RAPIDAPI_HEDGE_BUDGET = float(os.getenv('RAPIDAPI_HEDGE_BUDGET', 0.1))
+
+# Client-side limits for the RapidAPI plan (requests per second, burst, monthly quota)
+RAPIDAPI_RATE_LIMIT = float(os.getenv('RAPIDAPI_RATE_LIMIT', 5))
+RAPIDAPI_RATE_BURST = float(os.getenv('RAPIDAPI_RATE_BURST', 10))
+RAPIDAPI_MONTHLY_QUOTA = int(os.getenv('RAPIDAPI_MONTHLY_QUOTA')) if os.getenv('RAPIDAPI_MONTHLY_QUOTA') else None
+RAPIDAPI_MAX_QUEUE_WAIT = float(os.getenv('RAPIDAPI_MAX_QUEUE_WAIT', 1))
+
+# End-to-end time budget per search request; keep it below gunicorn's worker timeout
+SEARCH_REQUEST_BUDGET = float(os.getenv('SEARCH_REQUEST_BUDGET', 25))
+
+# Concurrency for multi-location fan-out (also sizes the HTTP connection pools)
+SEARCH_MAX_WORKERS = int(os.getenv('SEARCH_MAX_WORKERS', 5))
+SEARCH_MAX_LOCATIONS = int(os.getenv('SEARCH_MAX_LOCATIONS', 10))
+SEARCH_LOCATION_TIMEOUT = float(os.getenv('SEARCH_LOCATION_TIMEOUT', 20))
+
+# /ai-search requests that ask for results start searching the heuristic
+# parse's location right away, while the LLM is still parsing the query
+AI_SEARCH_SPECULATION = os.getenv('AI_SEARCH_SPECULATION', 'true').lower() == 'true'
+
+# Seconds of an AI search's budget kept for the RapidAPI call after the LLM
+# parse; the parse falls back to the heuristic parser when it can't fit
+AI_SEARCH_RESERVE = float(os.getenv('AI_SEARCH_RESERVE', 8))
+
+# Raw RapidAPI listing cache, keyed on the normalized upstream parameters
+SEARCH_CACHE_TTL = float(os.getenv('SEARCH_CACHE_TTL', 900))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 500))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv('SEARCH_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+SEARCH_CACHE_KEY_FIELDS = (
+    'placeId', 'adults', 'children', 'infants', 'pets',
+    'checkin', 'checkout', 'minPrice', 'maxPrice', 'currency'
+)
+
+# Paged searches (requests with a ``limit``) keep their merged, filtered
+# result set in memory so later pages don't search RapidAPI again
+SEARCH_PAGE_MAX_LIMIT = int(os.getenv('SEARCH_PAGE_MAX_LIMIT', 100))
+RESULT_SET_TTL = float(os.getenv('RESULT_SET_TTL', 600))
+RESULT_SET_MAX_ENTRIES = int(os.getenv('RESULT_SET_MAX_ENTRIES', 200))
+
+# Optional SQLite file shared by every gunicorn worker on the host, so that
+# recycled or newly forked workers start with a warm cache and the RapidAPI
+# rate limit and monthly quota hold for the host rather than per worker
+SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH')
+
+# Parsed LLM search parameters, by normalized query; persisted to
+# LLM_QUERY_CACHE_PATH (the shared cache file by default) when set
+LLM_QUERY_CACHE_TTL = float(os.getenv('LLM_QUERY_CACHE_TTL', 24 * 60 * 60))
+LLM_QUERY_CACHE_MAX_ENTRIES = int(os.getenv('LLM_QUERY_CACHE_MAX_ENTRIES', 1000))
+LLM_QUERY_CACHE_PATH = os.getenv('LLM_QUERY_CACHE_PATH', SHARED_CACHE_PATH)
+
+# Initialize services (one keep-alive HTTP client shared by every upstream call)
+http_client = PooledHTTPClient.from_env()
+shared_query_cache = SQLiteCache(LLM_QUERY_CACHE_PATH, 'llm_query', ttl=LLM_QUERY_CACHE_TTL) if LLM_QUERY_CACHE_PATH else None
+openrouter_service = OpenRouterService(
+    http_client=http_client,
+    query_cache=shared_query_cache,
+    cache_ttl=LLM_QUERY_CACHE_TTL,
+    cache_max_entries=LLM_QUERY_CACHE_MAX_ENTRIES
+)
 
 class ErrorType(Enum):
     """Error types for better error handling"""
@@ -61,46 +150,94 @@ class SearchResult:
     processing_time: float = 0.0
     source: str = "unknown"
 
+class CircuitBreakerOpenError(Exception):
+    """Raised when the circuit breaker rejects a call without running it"""
+    pass
+
 class CircuitBreaker:
-    """Circuit breaker pattern for external API calls"""
-    
-    def __init__(self, failure_threshold=5, recovery_timeout=60):
+    """Circuit breaker pattern for external API calls
+
+    The lock only guards state transitions; the wrapped call itself runs
+    outside of it so concurrent callers are never serialized. While
+    HALF_OPEN, at most ``half_open_max_calls`` trial calls are let through
+    and the breaker closes once that many of them have succeeded.
+    """
+
+    def __init__(self, failure_threshold=5, recovery_timeout=60, half_open_max_calls=1, excluded_exceptions=()):
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        # Exceptions that say nothing about upstream health (e.g. our own deadline)
+        self.excluded_exceptions = tuple(excluded_exceptions)
         self.failure_count = 0
         self.last_failure_time = None
         self.state = 'CLOSED'  # CLOSED, OPEN, HALF_OPEN
+        self._half_open_calls = 0
+        self._half_open_successes = 0
         self._lock = threading.Lock()
-    
-    def call(self, func, *args, **kwargs):
-        """Execute function with circuit breaker protection"""
+
+    def _before_call(self):
+        """Admit or reject a call, moving OPEN -> HALF_OPEN when the timeout elapsed"""
         with self._lock:
             if self.state == 'OPEN':
                 if time.time() - self.last_failure_time > self.recovery_timeout:
                     self.state = 'HALF_OPEN'
+                    self._half_open_calls = 0
+                    self._half_open_successes = 0
                 else:
-                    raise Exception("Circuit breaker is OPEN")
-            
-            try:
-                result = func(*args, **kwargs)
-                if self.state == 'HALF_OPEN':
+                    raise CircuitBreakerOpenError("Circuit breaker is OPEN")
+
+            if self.state == 'HALF_OPEN':
+                if self._half_open_calls >= self.half_open_max_calls:
+                    raise CircuitBreakerOpenError("Circuit breaker is HALF_OPEN and probe quota is exhausted")
+                self._half_open_calls += 1
+
+    def record_success(self):
+        """Record a successful call"""
+        with self._lock:
+            if self.state == 'HALF_OPEN':
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
                     self.state = 'CLOSED'
                     self.failure_count = 0
-                return result
-            except Exception as e:
-                self.failure_count += 1
-                self.last_failure_time = time.time()
-                
-                if self.failure_count >= self.failure_threshold:
-                    self.state = 'OPEN'
-                
-                raise e
+
+    def record_ignored(self):
+        """Record a call that neither succeeded nor failed, releasing its probe slot"""
+        with self._lock:
+            if self.state == 'HALF_OPEN' and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_failure(self):
+        """Record a failed call, opening the circuit when the threshold is reached"""
+        with self._lock:
+            self.failure_count += 1
+            self.last_failure_time = time.time()
+
+            # A failed probe re-opens the circuit immediately
+            if self.state == 'HALF_OPEN' or self.failure_count >= self.failure_threshold:
+                self.state = 'OPEN'
+
+    def call(self, func, *args, **kwargs):
+        """Execute function with circuit breaker protection"""
+        self._before_call()
+
+        try:
+            result = func(*args, **kwargs)
+        except self.excluded_exceptions:
+            self.record_ignored()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+
+        self.record_success()
+        return result
 
 class RetryHandler:
     """Retry handler with exponential backoff"""
     
     @staticmethod
-    def retry_with_backoff(max_retries=3, base_delay=1, max_delay=60):
+    def retry_with_backoff(max_retries=3, base_delay=1, max_delay=60, non_retryable=()):
         """Decorator for retry with exponential backoff"""
         def decorator(func):
             @wraps(func)
@@ -108,12 +245,21 @@ class RetryHandler:
                 for attempt in range(max_retries + 1):
                     try:
                         return func(*args, **kwargs)
+                    except non_retryable:
+                        raise
                     except Exception as e:
                         if attempt == max_retries:
                             logger.error(f"Function {func.__name__} failed after {max_retries} retries: {e}")
                             raise e
                         
                         delay = min(base_delay * (2 ** attempt), max_delay)
+                        
+                        # Never sleep past the caller's deadline
+                        deadline = kwargs.get('deadline')
+                        if deadline is not None and deadline.remaining() <= delay:
+                            logger.warning(f"Not retrying {func.__name__}: only {deadline.remaining():.2f}s of the request budget left")
+                            raise e
+                        
                         logger.warning(f"Attempt {attempt + 1} failed for {func.__name__}, retrying in {delay}s: {e}")
                         time.sleep(delay)
                 
@@ -203,6 +349,53 @@ class InputValidator:
                 pass
         
         return validated_filters
+    
+    @staticmethod
+    def validate_limit(limit: Any) -> Optional[int]:
+        """Page size clamped to 1..SEARCH_PAGE_MAX_LIMIT, or None for every result"""
+        if limit is None or isinstance(limit, bool):
+            return None
+        try:
+            return min(max(int(limit), 1), SEARCH_PAGE_MAX_LIMIT)
+        except (ValueError, TypeError):
+            return None
+    
+    @staticmethod
+    def validate_search_params(search_params: Dict) -> Dict:
+        """Keep parsed guest counts, ISO dates and prices that RapidAPI will accept"""
+        validated_params = {}
+        
+        # Guest counts (at least one adult)
+        for field, low, high in (('adults', 1, 16), ('children', 0, 15), ('infants', 0, 5), ('pets', 0, 5)):
+            try:
+                count = int(search_params[field])
+                if low <= count <= high:
+                    validated_params[field] = count
+            except (KeyError, ValueError, TypeError):
+                pass
+        
+        # Dates must be YYYY-MM-DD, with checkout after checkin
+        dates = {}
+        for field in ('checkin', 'checkout'):
+            try:
+                dates[field] = datetime.strptime(str(search_params[field]), '%Y-%m-%d').date()
+            except (KeyError, ValueError):
+                pass
+        if 'checkin' in dates and 'checkout' in dates and dates['checkout'] <= dates['checkin']:
+            dates.pop('checkout')
+        for field, value in dates.items():
+            validated_params[field] = value.isoformat()
+        
+        # Price range, same bounds as the search filters
+        for field, high in (('price_min', 10000), ('price_max', 50000)):
+            try:
+                price = int(float(search_params[field]))
+                if 0 < price <= high:
+                    validated_params[field] = price
+            except (KeyError, ValueError, TypeError):
+                pass
+        
+        return validated_params
 
 class EnhancedDataTransformer:
     """Enhanced data transformation with better error handling"""
@@ -297,237 +490,215 @@ class EnhancedDataTransformer:
         return default_image
 
 # Initialize enhanced services
-circuit_breaker = CircuitBreaker()
+circuit_breaker = CircuitBreaker(excluded_exceptions=(DeadlineExceeded, RateLimitExceeded))
 input_validator = InputValidator()
 data_transformer = EnhancedDataTransformer()
+search_cache = TTLCache(
+    max_entries=SEARCH_CACHE_MAX_ENTRIES,
+    ttl=SEARCH_CACHE_TTL,
+    max_bytes=SEARCH_CACHE_MAX_BYTES,
+    size_fn=lambda listings: len(json.dumps(listings))
+)
+if SHARED_CACHE_PATH:
+    search_cache = TieredCache(search_cache, SQLiteCache(SHARED_CACHE_PATH, 'listings', ttl=SEARCH_CACHE_TTL))
+search_flight = SingleFlight()
+result_set_cache = TTLCache(max_entries=RESULT_SET_MAX_ENTRIES, ttl=RESULT_SET_TTL)
+rapidapi_limiter = UpstreamRateLimiter(
+    SharedTokenBucket(RAPIDAPI_RATE_LIMIT, RAPIDAPI_RATE_BURST, SHARED_CACHE_PATH) if SHARED_CACHE_PATH
+    else TokenBucket(RAPIDAPI_RATE_LIMIT, RAPIDAPI_RATE_BURST),
+    monthly_quota=RAPIDAPI_MONTHLY_QUOTA,
+    max_wait=RAPIDAPI_MAX_QUEUE_WAIT,
+    usage=SharedMonthlyUsage(SHARED_CACHE_PATH) if SHARED_CACHE_PATH else MonthlyUsage()
+)
+search_hedger = HedgedCaller(
+    percentile=RAPIDAPI_HEDGE_PERCENTILE,
+    budget_ratio=RAPIDAPI_HEDGE_BUDGET,
+    max_workers=SEARCH_MAX_WORKERS * 2
+) if RAPIDAPI_HEDGING else None
+search_fanout = AsyncFanout(max_workers=SEARCH_MAX_WORKERS * 2, per_host_limit=SEARCH_MAX_WORKERS)
+speculative_runner = SpeculativeRunner(max_workers=SEARCH_MAX_WORKERS)
+
+def build_search_cache_key(params: Dict) -> tuple:
+    """Cache key for a RapidAPI search from its request parameters"""
+    return tuple(params.get(field) for field in SEARCH_CACHE_KEY_FIELDS)
 
 def get_place_id(location):
-    """Convert location string to Google Place ID with international support"""
-    # Enhanced location to Place ID mapping with international cities
-    place_ids = {
-        # US Cities
-        'san francisco': 'ChIJIQBpAG2ahYAR_6128GcTUEo',
-        'new york': 'ChIJOwg_06VPwokRYv534QaPC8g',
-        'los angeles': 'ChIJE9on3F3HwoAR9AhGJW_fL-I',
-        'chicago': 'ChIJ7cv00DwsDogRAMDACa2m4K8',
-        'miami': 'ChIJEcHIDqKw2YgRZU-t3XHylv8',
-        'seattle': 'ChIJVTPokywQkFQRmtVEaUZlJRA',
-        'boston': 'ChIJGzE-4ua3t4kRoRqiaseu_Qg',
-        'washington': 'ChIJW-T2Wt7Gt4kRKl2I1CJFUsI',
-        'las vegas': 'ChIJ0X31pIK3voARo3mz1ebVzDo',
-        'denver': 'ChIJzxcfI6qAa4cR1jaKJ_j0jhE',
-        'austin': 'ChIJLwPMoJm1RIYRetVp1EtGm10',
-        'portland': 'ChIJJ3SpfQsLlVQRkYXR9ua5Nhw',
-        'atlanta': 'ChIJ5dSg2UeX9YgRBS2sMgYvZpQ',
-        'phoenix': 'ChIJa147K9HKwoARHuGSk8b3cHo',
-        'philadelphia': 'ChIJ60u11Ni3xokRwVg-jNgU9Yk',
-        'san diego': 'ChIJ0X31pIK3voARo3mz1ebVzDo',
-        'dallas': 'ChIJS5dFe_cZTIYRj2dH9qSb7Lk',
-        'houston': 'ChIJAYWNSLS4QIYROwVl894CDco',
-        'orlando': 'ChIJvQz5TjQl54gRRNSLC4_U7Lk',
-        'nashville': 'ChIJPZDrEzLsZIgRoNrpodC5P30',
-        
-        # International Cities
-        'london': 'ChIJdd4hrwug2EcRmSrV3Vo6llI',
-        'paris': 'ChIJD7fiBh9u5kcRYJSMaMOCCwQ',
-        'tokyo': 'ChIJ51cu8IcbXWARiRtXIothAS4',
-        'sydney': 'ChIJP3Sa8ziYEmsRUKgyFmh9AQM',
-        'barcelona': 'ChIJ5TCOcRaYpBIRCmZHTz37sEQ',
-        'rome': 'ChIJu46S-ZZhLxMROG5lkwZ3D7k',
-        'amsterdam': 'ChIJVXealLU_xkcRja_At0z9AGY',
-        'berlin': 'ChIJAVkDPzdOqEcRcDteJg9eNg8',
-        'madrid': 'ChIJgTwKgJcpQg0RaSKMYcHeNsQ',
-        'vienna': 'ChIJN1t_tDeuEmsRUsoyG83frY4',
-        'prague': 'ChIJi3lwCZyTC0cRkEAWZg-vAAQ',
-        'budapest': 'ChIJyc_U0TTxQUcRYBEeDCnEAAQ',
-        'lisbon': 'ChIJ--acWvpzGQ0R4dWB0Y9T5fI',
-        'dublin': 'ChIJL6wn6oAOZ0gRoHExl6nHAAo',
-        'copenhagen': 'ChIJIz2AXDxTUkYRmFgW2OI5__s',
-        'stockholm': 'ChIJ-1-U7rZyyEYRzZLgw9BDqQQ',
-        'oslo': 'ChIJOfBn8mFuQUYRmh4j019gkn4',
-        'helsinki': 'ChIJ3fnh-L5LkkYRRI7RpIXXxQQ',
-        'zurich': 'ChIJGbIKnZPJkEcRp8Wa7JkXQQQ',
-        'geneva': 'ChIJL3JqrwJjjEcRaEwY6ySh_Q4',
-        'brussels': 'ChIJl5fz7WR9w0cRzaXdXo_hmpE',
-        'milan': 'ChIJ53USP0nBhkcRjQ50xhPN_zw',
-        'florence': 'ChIJrdbSgKNWKhMRk6t7AkG_7jQ',
-        'venice': 'ChIJf-7Fa3XJfkcRBONgdBYEYjQ',
-        'naples': 'ChIJd01Kz2SRORMRDjvOSqe_QQQ',
-        'athens': 'ChIJ8UNwBh-9oRQR3Y1mdkU1Nic',
-        'istanbul': 'ChIJawhoAASnyhQR0LABvJj-zOE',
-        'moscow': 'ChIJybDUc_xKtUYRTM9XV8zWRD0',
-        'mumbai': 'ChIJwe1EZjDG5zsRaYxkjY_tpF0',
-        'delhi': 'ChIJL_P_CXMEDTkRw0ZdG-0GVvw',
-        'singapore': 'ChIJyY4rtGcX2jERIKTaKVXwOgQ',
-        'hong kong': 'ChIJD5gyo-3iAzQRfMnq27qzivA',
-        'seoul': 'ChIJzWXFYYuifDUR64Pq5LTtioU',
-        'bangkok': 'ChIJ2a1DUOOe4jARSKy4mLMiDgQ',
-        'mexico city': 'ChIJB3UBaGEZ0oURaLlXbBiAiOo',
-        'sao paulo': 'ChIJ0WGkg4FEzpQRrlsz_whLqZs',
-        'rio de janeiro': 'ChIJW6AIkVXemwARTtIvZ2xC3FA',
-        'buenos aires': 'ChIJvQz5TjQl54gRRNSLC4_U7Lk',
-    }
-    
-    location_lower = location.lower().strip()
-    
-    # Try exact match first
-    if location_lower in place_ids:
-        return place_ids[location_lower]
-    
-    # Try partial match
-    for city, place_id in place_ids.items():
-        if city in location_lower or location_lower in city:
-            return place_id
-    
-    # Enhanced fallback logic
-    abbreviations = {
-        'sf': 'san francisco',
-        'nyc': 'new york',
-        'la': 'los angeles',
-        'vegas': 'las vegas',
-    }
-    
-    for abbr, full_name in abbreviations.items():
-        if abbr == location_lower and full_name in place_ids:
-            return place_ids[full_name]
-    
-    # Default to San Francisco if no match
-    logger.warning(f"No Place ID found for '{location}', defaulting to San Francisco")
-    return place_ids['san francisco']
+    """Convert location string to Google Place ID, or None if no city matches confidently"""
+    place_id = gazetteer.resolve(location)
+    if place_id is None:
+        logger.warning(f"No confident Place ID match for '{location}'")
+    return place_id
 
 def extract_multiple_locations_from_query(query):
     """Extract multiple locations from queries like 'cheapest large homes globally' or 'best properties in Europe'"""
-    query_lower = query.lower().strip()
+    return list(analyze_query(query).locations)
+
+def extract_search_criteria_from_query(query):
+    """Extract search criteria like 'cheapest', 'largest', 'most expensive' from query"""
+    return analyze_query(query).criteria
+
+def extract_location_from_query(query):
+    """Universal location extraction from natural language query"""
+    return analyze_query(query).location
+
+# Parts of a raw RapidAPI listing that listing_id and
+# transform_property_with_validation read; everything else is dropped as
+# the response is parsed
+LISTING_FIELDS = {
+    'id': True,
+    'title': True,
+    'avgRatingLocalized': True,
+    'listing': {'id': True, 'legacyName': True, 'title': True, 'legacyCity': True},
+    'structuredDisplayPrice': {'primaryLine': {'price': True}},
+    'contextualPictures': {'picture': True, 'url': True, 'src': True, 'image': True},
+    'demandStayListing': {'location': {'city': True}}
+}
+
+@RetryHandler.retry_with_backoff(
+    max_retries=2, base_delay=1, non_retryable=(RateLimitExceeded, DeadlineExceeded, CircuitBreakerOpenError)
+)
+def fetch_airbnb_search(location, checkin=None, checkout=None, adults=1, children=0, infants=0, pets=0, min_price=None, max_price=None, deadline=None):
+    """One RapidAPI Airbnb19 search behind the cache, rate limiter and circuit breaker
+
+    Timeouts, connection errors and non-200 responses raise, so the retry
+    decorator can back off and try again, never sleeping past ``deadline``.
+    When a ``deadline`` is given, the upstream read timeout and any wait on
+    an identical in-flight search are limited to the time it has left.
+    """
+    # Validate location first
+    if not input_validator.validate_location(location):
+        logger.error(f"Invalid location: {location}")
+        return []
     
-    # Global/multi-country patterns
-    global_patterns = [
-        r'globally|worldwide|international|anywhere',
-        r'best.*in.*world|cheapest.*globally|most.*expensive.*worldwide',
-        r'across.*countries|multiple.*countries|different.*countries'
-    ]
+    # Get Place ID for the location; don't spend an upstream call on a guess
+    place_id = get_place_id(location)
+    if place_id is None:
+        return []
+    logger.info(f"Using Place ID {place_id} for location: {location}")
     
-    # Regional patterns
-    regional_patterns = {
-        'europe': ['london', 'paris', 'barcelona', 'rome', 'amsterdam', 'berlin', 'madrid', 'vienna', 'prague'],
-        'asia': ['tokyo', 'singapore', 'hong kong', 'seoul', 'bangkok', 'mumbai', 'delhi'],
-        'americas': ['new york', 'los angeles', 'mexico city', 'sao paulo', 'buenos aires'],
-        'north america': ['new york', 'los angeles', 'chicago', 'mexico city'],
-        'south america': ['sao paulo', 'rio de janeiro', 'buenos aires'],
-    }
+    # Prepare RapidAPI request
+    url = "https://airbnb19.p.rapidapi.com/api/v2/searchPropertyByPlaceId"
     
-    # Check for global patterns
-    for pattern in global_patterns:
-        if re.search(pattern, query_lower):
-            # Return top international cities for global search
-            return ['new york', 'london', 'paris', 'tokyo', 'sydney']
+    params = {
+        "placeId": place_id,
+        "adults": adults,
+        "currency": "USD",
+        "guestFavorite": False,
+        "ib": False
+    }
     
-    # Check for regional patterns
-    for region, cities in regional_patterns.items():
-        if region in query_lower:
-            return cities[:5]  # Return top 5 cities from region
+    # Add optional parameters if provided
+    if children > 0:
+        params["children"] = children
+    if infants > 0:
+        params["infants"] = infants
+    if pets > 0:
+        params["pets"] = pets
+    if checkin:
+        params["checkin"] = checkin
+    if checkout:
+        params["checkout"] = checkout
+    if min_price:
+        params["minPrice"] = min_price
+    if max_price:
+        params["maxPrice"] = max_price
     
-    # Default to single location extraction
-    return [extract_location_from_query(query)]
-
-def extract_search_criteria_from_query(query):
-    """Extract search criteria like 'cheapest', 'largest', 'most expensive' from query"""
-    query_lower = query.lower().strip()
+    # Serve repeat searches from the cache. Callers annotate the listing
+    # dicts they get back, so hand out shallow copies and keep the
+    # cached entries untouched.
+    cache_key = build_search_cache_key(params)
+    cached_properties = search_cache.get(cache_key)
+    if cached_properties is not None:
+        logger.info(f"Cache hit: {len(cached_properties)} properties for {location}")
+        return [dict(prop) for prop in cached_properties]
     
-    criteria = {
-        'sort_by': None,
-        'property_size': None,
-        'price_preference': None
+    headers = {
+        "x-rapidapi-host": RAPIDAPI_HOST,
+        "x-rapidapi-key": RAPIDAPI_KEY
     }
     
-    # Price-related patterns
-    if re.search(r'cheapest|budget|affordable|lowest.?price', query_lower):
-        criteria['sort_by'] = 'price_asc'
-        criteria['price_preference'] = 'budget'
-    elif re.search(r'most.?expensive|luxury|highest.?price|premium', query_lower):
-        criteria['sort_by'] = 'price_desc'
-        criteria['price_preference'] = 'luxury'
-    
-    # Size-related patterns
-    if re.search(r'large|big|huge|massive|spacious', query_lower):
-        criteria['property_size'] = 'large'
-    elif re.search(r'small|tiny|compact|cozy', query_lower):
-        criteria['property_size'] = 'small'
-    
-    return criteria
-
-@RetryHandler.retry_with_backoff(max_retries=2, base_delay=1)
-def call_airbnb_search(location, checkin=None, checkout=None, adults=1, children=0, infants=0, pets=0, min_price=None, max_price=None):
-    """Enhanced call to RapidAPI Airbnb19 with circuit breaker and retry logic"""
-    try:
-        # Validate location first
-        if not input_validator.validate_location(location):
-            logger.error(f"Invalid location: {location}")
-            return []
-        
-        # Get Place ID for the location
-        place_id = get_place_id(location)
-        logger.info(f"Using Place ID {place_id} for location: {location}")
-        
-        # Prepare RapidAPI request
-        url = "https://airbnb19.p.rapidapi.com/api/v2/searchPropertyByPlaceId"
-        
-        params = {
-            "placeId": place_id,
-            "adults": adults,
-            "currency": "USD",
-            "guestFavorite": False,
-            "ib": False
-        }
-        
-        # Add optional parameters if provided
-        if children > 0:
-            params["children"] = children
-        if infants > 0:
-            params["infants"] = infants
-        if pets > 0:
-            params["pets"] = pets
-        if checkin:
-            params["checkin"] = checkin
-        if checkout:
-            params["checkout"] = checkout
-        if min_price:
-            params["minPrice"] = min_price
-        if max_price:
-            params["maxPrice"] = max_price
-        
-        headers = {
-            "x-rapidapi-host": RAPIDAPI_HOST,
-            "x-rapidapi-key": RAPIDAPI_KEY
-        }
-        
-        logger.info(f"Calling RapidAPI with params: {params}")
-        
-        # Make API request with circuit breaker
-        def api_call():
-            response = requests.get(
+    logger.info(f"Calling RapidAPI with params: {params}")
+    
+    read_timeout = RAPIDAPI_READ_TIMEOUT
+    wait_timeout = None
+    if deadline is not None:
+        deadline.check(f"searching {location}")
+        read_timeout = deadline.timeout(RAPIDAPI_READ_TIMEOUT)
+        wait_timeout = deadline.remaining()
+    
+    # Make API request with circuit breaker; returns the listings, or
+    # None when the response has no data.list array
+    def api_call():
+        try:
+            response = http_client.get(
                 url,
                 headers=headers,
                 params=params,
-                timeout=15
+                read_timeout=read_timeout,
+                stream=True
             )
-            
-            if response.status_code == 429:  # Rate limit
-                raise Exception("Rate limit exceeded")
-            elif response.status_code != 200:
-                raise Exception(f"API returned status {response.status_code}: {response.text}")
-            
-            return response.json()
-        
-        data = circuit_breaker.call(api_call)
-        
-        if 'data' in data and 'list' in data['data']:
-            properties = data['data']['list']
-            logger.info(f"RapidAPI returned {len(properties)} properties for {location}")
-            return properties
-        else:
-            logger.warning(f"Unexpected API response structure: {list(data.keys())}")
-            return []
-            
+            with response:
+                rapidapi_limiter.update_from_response(response.status_code, response.headers)
+                if response.status_code == 429:  # Rate limit
+                    raise RateLimitExceeded("RapidAPI rate limit exceeded")
+                elif response.status_code != 200:
+                    raise Exception(f"API returned status {response.status_code}: {response.text}")
+                
+                # Decode listings as the body arrives, keeping only the fields we use
+                try:
+                    return list(extract_json_array(
+                        response.iter_content(chunk_size=RAPIDAPI_STREAM_CHUNK_SIZE),
+                        ('data', 'list'),
+                        LISTING_FIELDS
+                    ))
+                except JSONArrayNotFound:
+                    return None
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            # A timeout we imposed to honor the deadline says nothing about
+            # RapidAPI's health (one while reading the body surfaces as a
+            # ConnectionError wrapping urllib3's ReadTimeoutError)
+            timed_out = isinstance(e, requests.exceptions.Timeout) or (e.args and isinstance(e.args[0], ReadTimeoutError))
+            if timed_out and read_timeout < RAPIDAPI_READ_TIMEOUT:
+                raise DeadlineExceeded(f"Request budget ran out while searching {location}") from e
+            raise
+    
+    # Every attempt, including a hedge, has to get past the rate limiter
+    # and the circuit breaker
+    def guarded_call():
+        rapidapi_limiter.acquire(max_wait=wait_timeout)
+        return circuit_breaker.call(api_call)
+    
+    fetch = guarded_call
+    if search_hedger is not None:
+        fetch = lambda: search_hedger.call(guarded_call, max_wait=wait_timeout)
+    
+    # Identical searches already in flight in this worker share one upstream request
+    properties = search_flight.do(cache_key, fetch, wait_timeout=wait_timeout)
+    
+    if properties is not None:
+        logger.info(f"RapidAPI returned {len(properties)} properties for {location}")
+        search_cache.set(cache_key, properties)
+        return [dict(prop) for prop in properties]
+    else:
+        logger.warning("Unexpected API response structure: no data.list array")
+        return []
+
+def call_airbnb_search(location, checkin=None, checkout=None, adults=1, children=0, infants=0, pets=0, min_price=None, max_price=None, deadline=None):
+    """Enhanced call to RapidAPI Airbnb19 with circuit breaker and retry logic
+
+    Failures that outlast the retries are logged and give no listings.
+    """
+    try:
+        return fetch_airbnb_search(
+            location, checkin=checkin, checkout=checkout, adults=adults, children=children, infants=infants,
+            pets=pets, min_price=min_price, max_price=max_price, deadline=deadline
+        )
+    except DeadlineExceeded as e:
+        logger.warning(str(e))
+        return []
+    except RateLimitExceeded as e:
+        logger.warning(f"RapidAPI call for {location} not sent: {e}")
+        return []
     except requests.exceptions.Timeout:
         logger.error("RapidAPI request timed out")
         return []
@@ -538,114 +709,233 @@ def call_airbnb_search(location, checkin=None, checkout=None, adults=1, children
         logger.error(f"RapidAPI error: {str(e)}")
         return []
 
-def search_multiple_locations(locations, criteria, filters=None):
-    """Enhanced search multiple locations with concurrent processing"""
-    if not locations:
-        return []
-    
+def collapse_locations(locations):
+    """Locations with a known Place ID, keeping the first location for each Place ID"""
+    place_locations = {}
+    for location in locations:
+        place_id = get_place_id(location)
+        if place_id is None:
+            continue
+        if place_id in place_locations:
+            logger.info(f"'{location}' has the same Place ID as '{place_locations[place_id]}', searching it once")
+            continue
+        place_locations[place_id] = location
+    return list(place_locations.values())
+
+def listing_id(prop: Dict) -> str:
+    """Airbnb listing id of a raw RapidAPI result, as transform_property_with_validation reads it"""
+    listing = prop.get('listing')
+    return str((listing.get('id') if isinstance(listing, dict) else None) or prop.get('id') or '')
+
+def iter_unique_listings(properties, seen: Optional[set] = None):
+    """Dedupe stage: drop listings already seen, keeping the first copy and its search_location
+
+    Pass the same ``seen`` set to dedupe across several batches.
+    """
+    seen = set() if seen is None else seen
+    for prop in properties:
+        prop_id = listing_id(prop)
+        if prop_id and prop_id in seen:
+            continue
+        seen.add(prop_id)
+        yield prop
+
+def dedupe_listings(properties: List[Dict], seen: Optional[set] = None) -> List[Dict]:
+    """iter_unique_listings as a list"""
+    return list(iter_unique_listings(properties, seen))
+
+def iter_location_results(locations, deadline=None, search_args=None):
+    """Yield (location, properties) for each location as soon as its search completes
+
+    ``search_args`` are extra call_airbnb_search arguments (e.g. a price
+    range) sent with every location. Locations that share a Place ID are
+    searched once, under the first of them. Locations that fail, or have
+    not finished when the deadline passes, are skipped.
+    """
     # Limit number of concurrent locations
-    locations = locations[:10]  # Max 10 locations
+    locations = collapse_locations(locations)[:SEARCH_MAX_LOCATIONS]
+    search_args = search_args or {}
     
-    all_properties = []
+    if len(locations) == 1:
+        yield locations[0], call_airbnb_search(locations[0], deadline=deadline, **search_args)
+        return
     
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        # Submit all location searches
-        future_to_location = {
-            executor.submit(call_airbnb_search, location): location
-            for location in locations
-        }
-        
-        # Collect results
-        for future in as_completed(future_to_location):
-            location = future_to_location[future]
-            try:
-                properties = future.result()
-                # Add location info to each property
-                for prop in properties:
-                    prop['search_location'] = location
-                all_properties.extend(properties)
-            except Exception as e:
-                logger.error(f"Error searching {location}: {e}")
-                continue
+    timeout = deadline.timeout(SEARCH_LOCATION_TIMEOUT) if deadline else SEARCH_LOCATION_TIMEOUT
     
-    logger.info(f"Found {len(all_properties)} total properties across {len(locations)} locations")
-    return all_properties
+    # Every location is fetched at once on the shared fan-out loop; the
+    # per-host semaphore keeps RapidAPI concurrency bounded
+    for location, properties, error in search_fanout.iter_completed(
+        lambda location: call_airbnb_search(location, deadline=deadline, **search_args),
+        locations, host=RAPIDAPI_HOST, timeout=timeout
+    ):
+        if error is not None:
+            logger.error(f"Error searching {location}: {error!r}")
+            continue
+        yield location, properties
 
-def extract_location_from_query(query):
-    """Universal location extraction from natural language query"""
-    query_lower = query.lower().strip()
-    
-    # Enhanced location extraction patterns
-    location_patterns = [
-        # Direct location patterns
-        r'in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'near\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'around\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'at\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'to\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'from\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'visit\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'explore\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'stay\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'places?\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'accommodation\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'hotel\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'apartment\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'room\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        r'house\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
-        # Location at end of query
-        r'([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)$'
-    ]
-    
-    # Try each pattern
-    for pattern in location_patterns:
-        matches = re.findall(pattern, query_lower)
-        for match in matches:
-            location = match.strip()
-            
-            # Skip common non-location words
-            skip_words = {
-                'a', 'an', 'the', 'big', 'small', 'nice', 'good', 'great', 'beautiful', 
-                'cheap', 'expensive', 'luxury', 'budget', 'find', 'looking', 'search',
-                'apartment', 'house', 'room', 'place', 'hotel', 'accommodation',
-                'stay', 'night', 'week', 'month', 'vacation', 'holiday', 'trip',
-                'family', 'couple', 'group', 'people', 'person', 'guest', 'guests',
-                'bedroom', 'bathroom', 'kitchen', 'pool', 'wifi', 'parking'
-            }
-            
-            # Clean and validate location
-            location_words = [word.strip() for word in location.split() if word.strip()]
-            location_words = [word for word in location_words if word not in skip_words]
-            
-            if location_words and len(' '.join(location_words)) >= 2:
-                # Capitalize properly and return
-                cleaned_location = ' '.join(word.capitalize() for word in location_words)
-                
-                # Additional validation - must contain at least one letter
-                if re.search(r'[a-zA-Z]', cleaned_location):
-                    return cleaned_location
-    
-    # Final fallback - return a generic location
-    return 'United States'
+def iter_search_listings(locations, filters=None, deadline=None):
+    """Fetch stage: raw listings from every location as each search completes, tagged with search_location"""
+    search_args = PropertyFilter(filters).upstream_params()
+    for location, properties in iter_location_results(locations, deadline=deadline, search_args=search_args):
+        # Add location info to each property
+        for prop in properties:
+            prop['search_location'] = location
+        yield from properties
 
-def transform_airbnb_properties(airbnb_properties):
-    """Enhanced transform RapidAPI Airbnb19 response with better error handling"""
-    transformed = []
-    
+def iter_transformed_properties(airbnb_properties):
+    """Transform stage: a Property for every raw listing that passes validation"""
     for prop in airbnb_properties:
         try:
             # Use enhanced data transformer
             transformed_prop = transform_property_with_validation(prop)
             if transformed_prop:
-                transformed.append(transformed_prop)
+                yield transformed_prop
                 
         except Exception as e:
             logger.error(f"Error transforming property: {e}")
             continue
+
+def transform_airbnb_properties(airbnb_properties) -> List[Property]:
+    """Enhanced transform RapidAPI Airbnb19 response with better error handling"""
+    return list(iter_transformed_properties(airbnb_properties))
+
+def ranking_sink(criteria: Dict, limit: Optional[int] = None) -> TopKSink:
+    """Sink keeping the first ``limit`` properties in sort_properties order"""
+    sort_by = criteria.get('sort_by')
+    key = (lambda x: x.price) if sort_by in ('price_asc', 'price_desc') else None
+    return TopKSink(limit=limit, key=key, reverse=sort_by == 'price_desc')
+
+def iter_pipeline_properties(airbnb_properties, stats: PipelineStats):
+    """Fetch -> dedupe -> transform stages: a Property for each new raw listing, timed into ``stats``"""
+    listings = stats.stage('fetch', airbnb_properties)
+    listings = stats.stage('dedupe', iter_unique_listings(listings))
+    return stats.stage('transform', iter_transformed_properties(listings))
+
+def run_property_pipeline(airbnb_properties, property_filter: PropertyFilter, sink,
+                          stats: Optional[PipelineStats] = None):
+    """Stream raw listings through fetch -> dedupe -> transform -> filter into ``sink``
+
+    Nothing is materialized between stages; ``sink`` (e.g. a TopKSink)
+    decides what is kept. Stage timings go to ``stats``.
+    """
+    stats = stats or PipelineStats()
+    properties = iter_pipeline_properties(airbnb_properties, stats)
+    if property_filter.active:
+        properties = stats.stage('filter', (prop for prop in properties if property_filter.matches(prop)))
+    return stats.drain('rank', properties, sink)
+
+# call_airbnb_search arguments and the parsed search parameter each comes from
+SEARCH_PARAM_FIELDS = (
+    ('adults', 'adults'), ('children', 'children'), ('infants', 'infants'), ('pets', 'pets'),
+    ('checkin', 'checkin'), ('checkout', 'checkout'),
+    ('min_price', 'price_min'), ('max_price', 'price_max')
+)
+SEARCH_PARAM_DEFAULTS = {'adults': 1, 'children': 0, 'infants': 0, 'pets': 0}
+
+def search_request_from_params(search_params: Dict, filters: Optional[Dict] = None) -> Dict:
+    """call_airbnb_search keyword arguments from parsed (LLM or heuristic) search parameters
+
+    Validated price filters from the client take precedence over prices
+    parsed from the query.
+    """
+    validated_params = input_validator.validate_search_params(search_params)
+    search_request = {'location': str(search_params.get('location') or '')}
+    for argument, field in SEARCH_PARAM_FIELDS:
+        if field in validated_params:
+            search_request[argument] = validated_params[field]
+    
+    search_request.update(PropertyFilter(filters).upstream_params())
+    return search_request
+
+def search_request_key(search_request: Dict) -> tuple:
+    """Requests with equal keys send RapidAPI the same search"""
+    return (get_place_id(search_request['location']),) + tuple(
+        search_request.get(argument, SEARCH_PARAM_DEFAULTS.get(argument)) for argument, _ in SEARCH_PARAM_FIELDS
+    )
+
+def ai_search_with_results(clean_query: str, deadline: Optional[Deadline] = None, filters: Optional[Dict] = None):
+    """Parse a query with the LLM and search the location it names
+
+    With AI_SEARCH_SPECULATION, the local heuristic parse is searched at
+    once; if the LLM asks for the same search, those results are used,
+    otherwise the LLM's search is issued when it answers.
+    Returns ``(search_params, properties, speculation)``.
+    """
+    parsed_query = analyze_query(clean_query)
+    guess = None
+    if AI_SEARCH_SPECULATION and parsed_query.fallback_location:
+        guess = search_request_from_params(parsed_query.to_search_params(), filters)
+    
+    def resolve():
+        # The LLM only gets what the budget has left once the search is reserved
+        timeout = None
+        if deadline is not None:
+            timeout = deadline.remaining() - AI_SEARCH_RESERVE - http_client.connect_timeout
+        search_params = openrouter_service.process_search_query(clean_query, timeout=timeout)
+        return search_request_from_params(search_params, filters), search_params
     
-    return transformed
+    def search(search_request):
+        properties = call_airbnb_search(deadline=deadline, **search_request)
+        for prop in properties:
+            prop['search_location'] = search_request['location']
+        return properties
+    
+    return speculative_runner.run(guess, resolve, search, key=search_request_key)
+
+def build_ai_search_data(clean_query: str, deadline: Deadline, filters: Optional[Dict] = None,
+                         limit: Optional[int] = None) -> Dict:
+    """Parse, search and transform: the response data for a combined AI search
+
+    With a ``limit``, only the best ``limit`` properties are kept while the
+    listings stream through; ``total`` still counts every match.
+    """
+    search_params, airbnb_properties, speculation = ai_search_with_results(clean_query, deadline, filters)
+    criteria = analyze_query(clean_query).criteria
+    property_filter = PropertyFilter(filters)
+    stats = PipelineStats()
+    sink = run_property_pipeline(airbnb_properties, property_filter, ranking_sink(criteria, limit), stats)
+    return {
+        'properties': serialize_properties(sink.results()),
+        'total': sink.total,
+        'query': clean_query,
+        'searchParams': search_params,
+        'criteria': criteria,
+        'speculation': speculation,
+        'partial': deadline.expired(),
+        'skippedFilters': property_filter.skipped_filters(),
+        'stages': stats.summary()
+    }
 
-def transform_property_with_validation(property_data: Dict) -> Optional[Dict]:
+def sort_properties(properties: List[Property], criteria: Dict) -> List[Property]:
+    """Sort transformed properties in place according to the search criteria"""
+    if criteria.get('sort_by') == 'price_asc':
+        properties.sort(key=lambda x: x.price)
+    elif criteria.get('sort_by') == 'price_desc':
+        properties.sort(key=lambda x: x.price, reverse=True)
+    return properties
+
+def select_properties(batch: PropertyBatch, criteria: Dict, offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
+    """One page of a result set, as dicts, in sort_properties order"""
+    return batch.to_dicts(batch.select(criteria.get('sort_by'), offset, limit))
+
+def result_set_key(clean_query: str, clean_filters: Dict) -> str:
+    """Stable id for the result set of a query and its filters"""
+    payload = json.dumps([clean_query, clean_filters], sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+def encode_cursor(result_key: str, offset: int) -> str:
+    return f"{result_key}:{offset}"
+
+def decode_cursor(cursor: Any, result_key: str) -> Optional[int]:
+    """Offset a cursor points at, or None if it is malformed or from another search"""
+    if not isinstance(cursor, str):
+        return None
+    key, _, offset = cursor.partition(':')
+    if key != result_key or not offset.isdigit():
+        return None
+    return int(offset)
+
+def transform_property_with_validation(property_data: Dict) -> Optional[Property]:
     """Transform property data with comprehensive validation"""
     try:
         if not isinstance(property_data, dict):
@@ -684,24 +974,19 @@ def transform_property_with_validation(property_data: Dict) -> Optional[Dict]:
         search_location = property_data.get('search_location', '')
         location = city or search_location or 'Location Available'
         
-        # Build validated property object
-        transformed_property = {
-            'id': property_id,
-            'title': title[:200],  # Limit title length
-            'price': price,
-            'currency': 'USD',
-            'rating': rating,
-            'reviewCount': review_count,
-            'imageUrl': image_url,
-            'location': location[:100],  # Limit location length
-            'url': f"https://www.airbnb.com/rooms/{property_id}",
-            'type': listing.get('title', 'Apartment')[:50],
-            'guests': 2,  # Default
-            'source': 'real_airbnb_rapidapi',
-            'bedrooms': 1,  # Default
-            'bathrooms': 1,  # Default
-            'amenities': ['WiFi', 'Kitchen']  # Default
-        }
+        # Build validated property object (guests, bedrooms, bathrooms,
+        # amenities, currency and source use Property's shared defaults)
+        transformed_property = Property.create(
+            id=property_id,
+            title=title[:200],  # Limit title length
+            price=price,
+            rating=rating,
+            review_count=review_count,
+            image_url=image_url,
+            location=location[:100],  # Limit location length
+            url=f"https://www.airbnb.com/rooms/{property_id}",
+            type=listing.get('title', 'Apartment')[:50]
+        )
         
         return transformed_property
         
@@ -719,10 +1004,82 @@ def health_check():
         'version': '2.0.0'
     })
 
+@app.route('/api/v1/stats', methods=['GET'])
+def get_stats():
+    """Runtime statistics for upstream connections"""
+    return jsonify({
+        'success': True,
+        'data': {
+            'httpPool': http_client.get_stats(),
+            'searchCache': search_cache.get_stats(),
+            'searchCoalescing': search_flight.get_stats(),
+            'hedging': search_hedger.get_stats() if search_hedger else None,
+            'rapidapiRateLimit': rapidapi_limiter.get_stats(),
+            'llmQueryCache': openrouter_service.get_cache_stats(),
+            'speculativeSearch': speculative_runner.get_stats(),
+            'resultSets': result_set_cache.get_stats(),
+            'jsonEncoder': app.json.encoder
+        }
+    })
+
+def search_result_set(clean_query: str, clean_filters: Dict, deadline: Deadline) -> Dict:
+    """Search every location the query names; a filtered, unsorted PropertyBatch and its context
+
+    Listings stream from the upstream searches through dedupe and
+    transform straight into the batch, which is then filtered column by
+    column; ``stages`` holds per-stage timings.
+    """
+    property_filter = PropertyFilter(clean_filters)
+    
+    # Extract locations and criteria from query
+    parsed_query = analyze_query(clean_query)
+    locations = list(parsed_query.locations)
+    criteria = parsed_query.criteria
+    
+    logger.info(f"Extracted locations: {locations}")
+    logger.info(f"Extracted criteria: {criteria}")
+    
+    # Perform search
+    if len(locations) > 1:
+        # Multi-location search, yielding each location's listings as it completes
+        airbnb_properties = iter_search_listings(locations, clean_filters, deadline=deadline)
+    else:
+        # Single location search
+        airbnb_properties = call_airbnb_search(locations[0], deadline=deadline, **property_filter.upstream_params())
+        # Add location info to each property
+        for prop in airbnb_properties:
+            prop['search_location'] = locations[0]
+    
+    # Stream listings into a batch: later pages need the whole result set
+    stats = PipelineStats()
+    batch = stats.drain('collect', iter_pipeline_properties(airbnb_properties, stats), PropertyBatch())
+    properties = stats.measure('filter', property_filter.apply_batch, batch)
+    stages = stats.summary()
+    logger.info(f"Search pipeline stages: {stages}")
+    
+    # Whatever finished before the budget ran out is still worth returning
+    partial = deadline.expired()
+    if partial:
+        logger.warning(f"Search budget of {SEARCH_REQUEST_BUDGET}s exhausted, returning partial results")
+    
+    return {
+        'properties': properties,
+        'locations': locations,
+        'criteria': criteria,
+        'partial': partial,
+        'skippedFilters': property_filter.skipped_filters(),
+        'stages': stages
+    }
+
 @app.route('/api/v1/search', methods=['POST'])
 def search_properties():
-    """Enhanced search endpoint with comprehensive error handling"""
+    """Enhanced search endpoint with comprehensive error handling
+
+    With a ``limit``, one page is returned along with a ``nextCursor`` to
+    send back for the next page.
+    """
     start_time = time.time()
+    deadline = Deadline(SEARCH_REQUEST_BUDGET)
     
     try:
         # Get request data
@@ -745,38 +1102,40 @@ def search_properties():
                 'data': {'properties': [], 'total': 0}
             }), 400
         
-        # Extract and validate filters
+        # Extract and validate filters and paging
         filters = data.get('filters', {})
         clean_filters = input_validator.validate_filters(filters)
-        
-        logger.info(f"Processing search request: '{clean_query}' with filters: {clean_filters}")
-        
-        # Extract locations and criteria from query
-        locations = extract_multiple_locations_from_query(clean_query)
-        criteria = extract_search_criteria_from_query(clean_query)
-        
-        logger.info(f"Extracted locations: {locations}")
-        logger.info(f"Extracted criteria: {criteria}")
-        
-        # Perform search
-        if len(locations) > 1:
-            # Multi-location search
-            airbnb_properties = search_multiple_locations(locations, criteria, clean_filters)
+        limit = input_validator.validate_limit(data.get('limit'))
+        result_key = result_set_key(clean_query, clean_filters)
+        
+        # Later pages come from the result set the first page cached
+        offset = 0
+        result_set = None
+        if data.get('cursor') is not None:
+            offset = decode_cursor(data['cursor'], result_key)
+            if offset is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid cursor',
+                    'data': {'properties': [], 'total': 0}
+                }), 400
+            result_set = result_set_cache.get(result_key)
+        
+        stages = None
+        if result_set is None:
+            logger.info(f"Processing search request: '{clean_query}' with filters: {clean_filters}")
+            result_set = search_result_set(clean_query, clean_filters, deadline)
+            stages = result_set['stages']
+            if limit is not None:
+                result_set_cache.set(result_key, result_set)
         else:
-            # Single location search
-            airbnb_properties = call_airbnb_search(locations[0])
-            # Add location info to each property
-            for prop in airbnb_properties:
-                prop['search_location'] = locations[0]
+            logger.info(f"Serving page at offset {offset} of '{clean_query}' from the cached result set")
         
-        # Transform properties
-        transformed_properties = transform_airbnb_properties(airbnb_properties)
-        
-        # Apply sorting based on criteria
-        if criteria.get('sort_by') == 'price_asc':
-            transformed_properties.sort(key=lambda x: x.get('price', 0))
-        elif criteria.get('sort_by') == 'price_desc':
-            transformed_properties.sort(key=lambda x: x.get('price', 0), reverse=True)
+        # Select the requested page in the order the criteria ask for
+        all_properties = result_set['properties']
+        transformed_properties = select_properties(all_properties, result_set['criteria'], offset, limit)
+        next_offset = offset + len(transformed_properties)
+        next_cursor = encode_cursor(result_key, next_offset) if limit is not None and next_offset < len(all_properties) else None
         
         # Calculate processing time
         processing_time = time.time() - start_time
@@ -786,10 +1145,14 @@ def search_properties():
             'success': True,
             'data': {
                 'properties': transformed_properties,
-                'total': len(transformed_properties),
+                'total': len(all_properties),
                 'query': clean_query,
-                'locations': locations,
-                'criteria': criteria,
+                'locations': result_set['locations'],
+                'criteria': result_set['criteria'],
+                'partial': result_set['partial'],
+                'skippedFilters': result_set['skippedFilters'],
+                'nextCursor': next_cursor,
+                'stages': stages,
                 'processingTime': round(processing_time, 2),
                 'source': 'enhanced_rapidapi_search'
             }
@@ -813,6 +1176,151 @@ def search_properties():
             }
         }), 500
 
+@app.route('/api/v1/ai-search', methods=['POST'])
+def ai_search_properties():
+    """Parse a natural-language query and return matching listings in one round trip
+
+    Guests, dates and the price range the LLM extracts are sent to RapidAPI
+    with the location, so the upstream search is as narrow as the query.
+    """
+    start_time = time.time()
+    deadline = Deadline(SEARCH_REQUEST_BUDGET)
+    
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No JSON data provided',
+                'data': {'properties': [], 'total': 0}
+            }), 400
+        
+        clean_query = input_validator.sanitize_query(data.get('query', ''))
+        if not clean_query:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid or empty query',
+                'data': {'properties': [], 'total': 0}
+            }), 400
+        
+        clean_filters = input_validator.validate_filters(data.get('filters', {}))
+        limit = input_validator.validate_limit(data.get('limit'))
+        logger.info(f"Processing combined AI search request: '{clean_query}' with filters: {clean_filters}")
+        
+        response_data = build_ai_search_data(clean_query, deadline, clean_filters, limit)
+        
+        processing_time = time.time() - start_time
+        response_data['processingTime'] = round(processing_time, 2)
+        response_data['source'] = 'ai_rapidapi_search'
+        
+        logger.info(f"AI search completed: {response_data['total']} properties in {processing_time:.2f}s")
+        return jsonify({'success': True, 'data': response_data})
+        
+    except Exception as e:
+        processing_time = time.time() - start_time
+        logger.error(f"AI search request failed: {e}")
+        
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'data': {
+                'properties': [],
+                'total': 0,
+                'processingTime': round(processing_time, 2)
+            }
+        }), 500
+
+def format_stream_frame(frame: Dict, use_sse: bool) -> str:
+    """Encode one streaming frame as an NDJSON line or a Server-Sent Event"""
+    payload = app.json.dumps(frame)
+    if use_sse:
+        return f"event: {frame['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+@app.route('/api/v1/search/stream', methods=['POST'])
+def stream_search_properties():
+    """Streaming search endpoint: one frame per location as it completes, then a summary
+
+    Responds with NDJSON by default, or Server-Sent Events when the client
+    sends ``Accept: text/event-stream`` or ``?format=sse``.
+    """
+    start_time = time.time()
+    deadline = Deadline(SEARCH_REQUEST_BUDGET)
+    
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({
+            'success': False,
+            'error': 'No JSON data provided'
+        }), 400
+    
+    clean_query = input_validator.sanitize_query(data.get('query', ''))
+    if not clean_query:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid or empty query'
+        }), 400
+    
+    property_filter = PropertyFilter(input_validator.validate_filters(data.get('filters', {})))
+    parsed_query = analyze_query(clean_query)
+    locations = list(parsed_query.locations)
+    criteria = parsed_query.criteria
+    use_sse = (request.args.get('format') == 'sse' or
+               'text/event-stream' in request.headers.get('Accept', ''))
+    
+    logger.info(f"Processing streaming search request: '{clean_query}' across {locations}")
+    
+    def generate():
+        all_properties = []
+        seen = set()
+        yield format_stream_frame({
+            'type': 'meta',
+            'query': clean_query,
+            'locations': locations,
+            'criteria': criteria
+        }, use_sse)
+        
+        try:
+            for location, airbnb_properties in iter_location_results(
+                locations, deadline=deadline, search_args=property_filter.upstream_params()
+            ):
+                for prop in airbnb_properties:
+                    prop['search_location'] = location
+                airbnb_properties = dedupe_listings(airbnb_properties, seen)
+                properties = sort_properties(property_filter.apply(transform_airbnb_properties(airbnb_properties)), criteria)
+                all_properties.extend(properties)
+                
+                yield format_stream_frame({
+                    'type': 'location',
+                    'location': location,
+                    'properties': serialize_properties(properties),
+                    'count': len(properties),
+                    'elapsed': round(time.time() - start_time, 2)
+                }, use_sse)
+        except Exception as e:
+            logger.error(f"Streaming search failed: {e}")
+            yield format_stream_frame({'type': 'error', 'error': 'Internal server error'}, use_sse)
+        
+        sort_properties(all_properties, criteria)
+        yield format_stream_frame({
+            'type': 'summary',
+            'total': len(all_properties),
+            'query': clean_query,
+            'locations': locations,
+            'criteria': criteria,
+            'ordering': [prop.id for prop in all_properties],
+            'partial': deadline.expired(),
+            'skippedFilters': property_filter.skipped_filters(),
+            'processingTime': round(time.time() - start_time, 2),
+            'source': 'enhanced_rapidapi_search'
+        }, use_sse)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if use_sse else 'application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/ai-search', methods=['POST'])
 def ai_search():
     """AI-powered search endpoint using OpenRouter"""
@@ -837,8 +1345,13 @@ def ai_search():
         
         logger.info(f"Processing AI search request: '{clean_query}'")
         
-        # Use OpenRouter service for AI processing
-        ai_response = openrouter_service.process_search_query(clean_query)
+        if not data.get('search'):
+            # Use OpenRouter service for AI processing
+            ai_response = openrouter_service.process_search_query(clean_query)
+        else:
+            # Parse and search; the search may start before the LLM answers
+            limit = input_validator.validate_limit(data.get('limit'))
+            ai_response = build_ai_search_data(clean_query, Deadline(SEARCH_REQUEST_BUDGET), limit=limit)
         
         processing_time = time.time() - start_time
         
@@ -863,21 +1376,7 @@ def ai_search():
 @app.route('/locations', methods=['GET'])
 def get_supported_locations():
     """Get list of supported locations"""
-    locations = [
-        # US Cities
-        'San Francisco', 'New York', 'Los Angeles', 'Chicago', 'Miami', 'Seattle',
-        'Boston', 'Washington', 'Las Vegas', 'Denver', 'Austin', 'Portland',
-        'Atlanta', 'Phoenix', 'Philadelphia', 'San Diego', 'Dallas', 'Houston',
-        'Orlando', 'Nashville',
-        
-        # International Cities
-        'London', 'Paris', 'Tokyo', 'Sydney', 'Barcelona', 'Rome', 'Amsterdam',
-        'Berlin', 'Madrid', 'Vienna', 'Prague', 'Budapest', 'Lisbon', 'Dublin',
-        'Copenhagen', 'Stockholm', 'Oslo', 'Helsinki', 'Zurich', 'Geneva',
-        'Brussels', 'Milan', 'Florence', 'Venice', 'Naples', 'Athens', 'Istanbul',
-        'Moscow', 'Mumbai', 'Delhi', 'Singapore', 'Hong Kong', 'Seoul', 'Bangkok',
-        'Mexico City', 'Sao Paulo', 'Rio de Janeiro', 'Buenos Aires'
-    ]
+    locations = gazetteer.display_names
     
     return jsonify({
         'success': True,
@@ -11,7 +11,8 @@ worker_connections = 1000
 timeout = 30
 keepalive = 2
 
-# Restart workers after this many requests, to help prevent memory leaks
+# Restart workers after this many requests, to help prevent memory leaks.
+# Set SHARED_CACHE_PATH so recycled workers start with a warm result cache.
 max_requests = 1000
 max_requests_jitter = 50
 
@@ -0,0 +1,34 @@
+import time
+from typing import Optional
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's time budget runs out before work could start"""
+    pass
+
+class Deadline:
+    """End-to-end time budget for one request
+
+    Created once at the route and passed down, so that retries, upstream
+    timeouts and the multi-location fan-out only ever use what is left.
+    """
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Remaining time, capped at the stage's own timeout"""
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+    def check(self, stage: str = 'request'):
+        """Raise DeadlineExceeded if no time is left for ``stage``"""
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.budget}s exceeded before {stage}")
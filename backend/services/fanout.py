@@ -0,0 +1,83 @@
+import os
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class AsyncFanout:
+    """Fan-out engine for multi-location searches on a long-lived asyncio loop
+
+    Every fetch is scheduled as a coroutine on one background event loop,
+    limited by a per-host semaphore and an optional per-item timeout.
+    Coroutine functions are awaited directly; blocking functions (our
+    pooled ``requests`` client) run on one bounded, shared executor, so a
+    request never spins up threads of its own.
+    """
+
+    def __init__(self, max_workers: int = 10, per_host_limit: int = 5):
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop = None
+        self._executor = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread lazily, and again in each forked gunicorn worker"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._semaphores = {}
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='search-fetch')
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='search-fanout', daemon=True).start()
+            return self._loop
+
+    def _host_semaphore(self, host: str) -> asyncio.Semaphore:
+        # Only ever called on the loop thread, so no locking needed
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return semaphore
+
+    async def _run_one(self, func: Callable, item: Any, host: str) -> Any:
+        async with self._host_semaphore(host):
+            if asyncio.iscoroutinefunction(func):
+                return await func(item)
+
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, item)
+
+    def iter_completed(self, func: Callable, items: Iterable, host: str = 'default',
+                       timeout: Optional[float] = None) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+        """Run ``func(item)`` for every item at once, yielding ``(item, result, error)`` as each finishes
+
+        ``timeout`` covers both queueing for the host semaphore and the call
+        itself. A call that exceeds it is reported with an
+        ``asyncio.TimeoutError``; a blocking call keeps its executor thread
+        until its own socket timeout fires.
+        """
+        items = list(items)
+        if not items:
+            return
+
+        loop = self._ensure_started()
+        completed: 'queue.Queue[Tuple[Any, Any, Optional[BaseException]]]' = queue.Queue()
+
+        async def run_and_report(item):
+            try:
+                result = await asyncio.wait_for(self._run_one(func, item, host), timeout)
+                completed.put((item, result, None))
+            except Exception as e:
+                completed.put((item, None, e))
+
+        for item in items:
+            asyncio.run_coroutine_threadsafe(run_and_report(item), loop)
+
+        for _ in range(len(items)):
+            yield completed.get()
@@ -0,0 +1,263 @@
+import os
+import math
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Minimum trigram similarity (0-1) for a misspelled location to count as a
+# known city; below it the location is skipped instead of searched upstream.
+# One dropped letter in a short name scores 0.61 ("londn"), while unrelated
+# names sharing a stem score 0.50-0.53 ("austria" vs Austin, "nice" vs Venice)
+LOCATION_MATCH_THRESHOLD = float(os.getenv('LOCATION_MATCH_THRESHOLD', 0.6))
+
+# Supported cities and their Google Place IDs, most important first: when a
+# location string matches several cities, the earliest entry wins.
+CITY_PLACE_IDS: List[Tuple[str, str]] = [
+    # US Cities
+    ('San Francisco', 'ChIJIQBpAG2ahYAR_6128GcTUEo'),
+    ('New York', 'ChIJOwg_06VPwokRYv534QaPC8g'),
+    ('Los Angeles', 'ChIJE9on3F3HwoAR9AhGJW_fL-I'),
+    ('Chicago', 'ChIJ7cv00DwsDogRAMDACa2m4K8'),
+    ('Miami', 'ChIJEcHIDqKw2YgRZU-t3XHylv8'),
+    ('Seattle', 'ChIJVTPokywQkFQRmtVEaUZlJRA'),
+    ('Boston', 'ChIJGzE-4ua3t4kRoRqiaseu_Qg'),
+    ('Washington', 'ChIJW-T2Wt7Gt4kRKl2I1CJFUsI'),
+    ('Las Vegas', 'ChIJ0X31pIK3voARo3mz1ebVzDo'),
+    ('Denver', 'ChIJzxcfI6qAa4cR1jaKJ_j0jhE'),
+    ('Austin', 'ChIJLwPMoJm1RIYRetVp1EtGm10'),
+    ('Portland', 'ChIJJ3SpfQsLlVQRkYXR9ua5Nhw'),
+    ('Atlanta', 'ChIJ5dSg2UeX9YgRBS2sMgYvZpQ'),
+    ('Phoenix', 'ChIJa147K9HKwoARHuGSk8b3cHo'),
+    ('Philadelphia', 'ChIJ60u11Ni3xokRwVg-jNgU9Yk'),
+    ('San Diego', 'ChIJ0X31pIK3voARo3mz1ebVzDo'),
+    ('Dallas', 'ChIJS5dFe_cZTIYRj2dH9qSb7Lk'),
+    ('Houston', 'ChIJAYWNSLS4QIYROwVl894CDco'),
+    ('Orlando', 'ChIJvQz5TjQl54gRRNSLC4_U7Lk'),
+    ('Nashville', 'ChIJPZDrEzLsZIgRoNrpodC5P30'),
+
+    # International Cities
+    ('London', 'ChIJdd4hrwug2EcRmSrV3Vo6llI'),
+    ('Paris', 'ChIJD7fiBh9u5kcRYJSMaMOCCwQ'),
+    ('Tokyo', 'ChIJ51cu8IcbXWARiRtXIothAS4'),
+    ('Sydney', 'ChIJP3Sa8ziYEmsRUKgyFmh9AQM'),
+    ('Barcelona', 'ChIJ5TCOcRaYpBIRCmZHTz37sEQ'),
+    ('Rome', 'ChIJu46S-ZZhLxMROG5lkwZ3D7k'),
+    ('Amsterdam', 'ChIJVXealLU_xkcRja_At0z9AGY'),
+    ('Berlin', 'ChIJAVkDPzdOqEcRcDteJg9eNg8'),
+    ('Madrid', 'ChIJgTwKgJcpQg0RaSKMYcHeNsQ'),
+    ('Vienna', 'ChIJN1t_tDeuEmsRUsoyG83frY4'),
+    ('Prague', 'ChIJi3lwCZyTC0cRkEAWZg-vAAQ'),
+    ('Budapest', 'ChIJyc_U0TTxQUcRYBEeDCnEAAQ'),
+    ('Lisbon', 'ChIJ--acWvpzGQ0R4dWB0Y9T5fI'),
+    ('Dublin', 'ChIJL6wn6oAOZ0gRoHExl6nHAAo'),
+    ('Copenhagen', 'ChIJIz2AXDxTUkYRmFgW2OI5__s'),
+    ('Stockholm', 'ChIJ-1-U7rZyyEYRzZLgw9BDqQQ'),
+    ('Oslo', 'ChIJOfBn8mFuQUYRmh4j019gkn4'),
+    ('Helsinki', 'ChIJ3fnh-L5LkkYRRI7RpIXXxQQ'),
+    ('Zurich', 'ChIJGbIKnZPJkEcRp8Wa7JkXQQQ'),
+    ('Geneva', 'ChIJL3JqrwJjjEcRaEwY6ySh_Q4'),
+    ('Brussels', 'ChIJl5fz7WR9w0cRzaXdXo_hmpE'),
+    ('Milan', 'ChIJ53USP0nBhkcRjQ50xhPN_zw'),
+    ('Florence', 'ChIJrdbSgKNWKhMRk6t7AkG_7jQ'),
+    ('Venice', 'ChIJf-7Fa3XJfkcRBONgdBYEYjQ'),
+    ('Naples', 'ChIJd01Kz2SRORMRDjvOSqe_QQQ'),
+    ('Athens', 'ChIJ8UNwBh-9oRQR3Y1mdkU1Nic'),
+    ('Istanbul', 'ChIJawhoAASnyhQR0LABvJj-zOE'),
+    ('Moscow', 'ChIJybDUc_xKtUYRTM9XV8zWRD0'),
+    ('Mumbai', 'ChIJwe1EZjDG5zsRaYxkjY_tpF0'),
+    ('Delhi', 'ChIJL_P_CXMEDTkRw0ZdG-0GVvw'),
+    ('Singapore', 'ChIJyY4rtGcX2jERIKTaKVXwOgQ'),
+    ('Hong Kong', 'ChIJD5gyo-3iAzQRfMnq27qzivA'),
+    ('Seoul', 'ChIJzWXFYYuifDUR64Pq5LTtioU'),
+    ('Bangkok', 'ChIJ2a1DUOOe4jARSKy4mLMiDgQ'),
+    ('Mexico City', 'ChIJB3UBaGEZ0oURaLlXbBiAiOo'),
+    ('Sao Paulo', 'ChIJ0WGkg4FEzpQRrlsz_whLqZs'),
+    ('Rio de Janeiro', 'ChIJW6AIkVXemwARTtIvZ2xC3FA'),
+    ('Buenos Aires', 'ChIJvQz5TjQl54gRRNSLC4_U7Lk'),
+]
+
+# Abbreviations and nicknames, resolved before any substring matching
+CITY_ALIASES: Dict[str, str] = {
+    'sf': 'san francisco',
+    'nyc': 'new york',
+    'la': 'los angeles',
+    'vegas': 'las vegas',
+}
+
+def normalize_location(location: str) -> str:
+    """Lowercase and collapse whitespace"""
+    return ' '.join(location.lower().split())
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of ``text``, padded so word edges count"""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class Gazetteer:
+    """Location-to-Place-ID index built once at import
+
+    Resolution order:
+
+    1. exact name or alias, via a hash lookup;
+    2. the highest-priority city whose name appears inside the location
+       string ("cheap stays in paris france"), via an Aho-Corasick
+       automaton, so the cost depends on the length of the string rather
+       than the number of cities;
+    3. the highest-priority city that the location is a fragment of
+       ("york", "barcel"), via a hash index of every word run and every
+       word prefix of at least three letters;
+    4. the most similar city name by trigram overlap ("barcelna"), via an
+       inverted index from trigram to cities, provided the similarity
+       reaches ``min_similarity``.
+    """
+
+    MIN_PREFIX = 3
+    DEFAULT_MIN_SIMILARITY = LOCATION_MATCH_THRESHOLD
+
+    def __init__(self, cities: Iterable[Tuple[str, str]], aliases: Optional[Dict[str, str]] = None):
+        self.display_names: List[str] = []
+        self.place_ids: Dict[str, str] = {}
+
+        for display_name, place_id in cities:
+            name = normalize_location(display_name)
+            if name in self.place_ids:
+                continue
+            self.display_names.append(display_name)
+            self.place_ids[name] = place_id
+
+        self._names = list(self.place_ids)
+        self._exact: Dict[str, str] = dict(self.place_ids)
+        for alias, name in (aliases or {}).items():
+            if name in self.place_ids:
+                self._exact.setdefault(normalize_location(alias), self.place_ids[name])
+
+        self._fragments = self._build_fragment_index()
+        self._build_automaton()
+        self._build_trigram_index()
+
+    def _build_fragment_index(self) -> Dict[str, str]:
+        """Map word runs and word prefixes to the highest-priority city containing them"""
+        fragments: Dict[str, str] = {}
+        for name in self._names:
+            words = name.split()
+            for start in range(len(words)):
+                for end in range(start + 1, len(words) + 1):
+                    fragments.setdefault(' '.join(words[start:end]), name)
+                word = words[start]
+                for length in range(self.MIN_PREFIX, len(word)):
+                    fragments.setdefault(word[:length], name)
+        return fragments
+
+    def _build_automaton(self):
+        """Aho-Corasick automaton over city names; each state keeps its best (lowest) rank"""
+        no_match = len(self._names)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._best: List[int] = [no_match]
+
+        for rank, name in enumerate(self._names):
+            state = 0
+            for char in name:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(no_match)
+                state = next_state
+            self._best[state] = min(self._best[state], rank)
+
+        # Breadth-first pass to set failure links and fold in suffix matches
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._best[next_state] = min(self._best[next_state], self._best[self._fail[next_state]])
+                queue.append(next_state)
+
+    def _build_trigram_index(self):
+        """Inverted index from trigram to the ranks of the cities containing it"""
+        self._trigram_sets: List[frozenset] = []
+        self._postings: Dict[str, List[int]] = {}
+        for rank, name in enumerate(self._names):
+            grams = frozenset(trigrams(name))
+            self._trigram_sets.append(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(rank)
+
+    def fuzzy_match(self, location: str, min_similarity: float = 0.0) -> Optional[Tuple[str, float]]:
+        """Most similar city name and its Dice similarity (0-1), or None if none reaches ``min_similarity``
+
+        A city can only reach the threshold if it shares enough trigrams with
+        the query, so candidates are drawn from the postings of the query's
+        rarest trigrams alone and the common ones ("ill", "an ") are skipped.
+        """
+        grams = trigrams(normalize_location(location))
+        present = sorted((gram for gram in grams if gram in self._postings), key=lambda gram: len(self._postings[gram]))
+        if not present:
+            return None
+
+        # Dice >= t needs an overlap of at least t * |q| / (2 - t) trigrams
+        min_overlap = max(math.ceil(min_similarity * len(grams) / (2 - min_similarity)), 1)
+        if min_overlap > len(present):
+            return None
+        candidates = set()
+        for gram in present[:len(present) - min_overlap + 1]:
+            candidates.update(self._postings[gram])
+
+        best_rank, best_score = None, 0.0
+        for rank in candidates:
+            city_grams = self._trigram_sets[rank]
+            score = 2 * len(grams & city_grams) / (len(grams) + len(city_grams))
+            if score > best_score or (score == best_score and rank < best_rank):
+                best_rank, best_score = rank, score
+        if best_rank is None or best_score < min_similarity:
+            return None
+        return self._names[best_rank], best_score
+
+    def find_contained_city(self, text: str) -> Optional[str]:
+        """Highest-priority city name that occurs anywhere in ``text``"""
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        found = len(self._names)
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best[state] < found:
+                found = best[state]
+        return self._names[found] if found < len(self._names) else None
+
+    def resolve(self, location: str, min_similarity: Optional[float] = None) -> Optional[str]:
+        """Place ID for a location string, or None if nothing matches confidently"""
+        name = normalize_location(location)
+        if not name:
+            return None
+
+        place_id = self._exact.get(name)
+        if place_id is not None:
+            return place_id
+
+        city = self.find_contained_city(name) or self._fragments.get(name)
+        if city:
+            return self.place_ids[city]
+
+        if min_similarity is None:
+            min_similarity = self.DEFAULT_MIN_SIMILARITY
+        match = self.fuzzy_match(name, min_similarity)
+        if match is None:
+            return None
+        city, score = match
+        logger.info(f"Fuzzy matched '{location}' to '{city}' (similarity {score:.2f})")
+        return self.place_ids[city]
+
+    def is_known_location(self, location: str) -> bool:
+        """Whether ``resolve`` would find a Place ID, i.e. whether a search for it would be sent"""
+        return self.resolve(location) is not None
+
+gazetteer = Gazetteer(CITY_PLACE_IDS, CITY_ALIASES)
@@ -0,0 +1,139 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class LatencyTracker:
+    """Rolling window of recent call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency at ``pct`` (0-100), or None until there are enough samples"""
+        with self._lock:
+            if len(self._samples) < 20:
+                return None
+            ordered = sorted(self._samples)
+        index = min(int(len(ordered) * pct / 100), len(ordered) - 1)
+        return ordered[index]
+
+class HedgeBudget:
+    """Caps hedges at a fraction of primary calls so quota use stays bounded
+
+    Every primary call earns ``ratio`` of a token; a hedge spends a whole one.
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 5):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.burst)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+class HedgedCaller:
+    """Send a second identical request when the first is slower than usual
+
+    The hedge fires once the primary has been outstanding longer than the
+    configured latency percentile. Whichever attempt succeeds first wins;
+    the other is cancelled if it has not started, and otherwise left to
+    finish on its own since a blocking HTTP call cannot be interrupted.
+    """
+
+    def __init__(self, percentile: float = 95, default_delay: float = 1.0, min_delay: float = 0.05,
+                 budget_ratio: float = 0.1, max_workers: int = 10):
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.latencies = LatencyTracker()
+        self.budget = HedgeBudget(ratio=budget_ratio)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='search-hedge')
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait on the primary before hedging"""
+        observed = self.latencies.percentile(self.percentile)
+        return max(observed if observed is not None else self.default_delay, self.min_delay)
+
+    def _timed(self, func: Callable) -> Any:
+        start = time.monotonic()
+        result = func()
+        self.latencies.record(time.monotonic() - start)
+        return result
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def call(self, func: Callable, max_wait: Optional[float] = None) -> Any:
+        """Run ``func`` with an optional hedge; ``max_wait`` bounds the hedge delay (e.g. a deadline)"""
+        self._count('calls')
+        self.budget.earn()
+
+        primary = self._executor.submit(self._timed, func)
+        delay = self.hedge_delay()
+        if max_wait is not None and max_wait <= delay:
+            return primary.result()
+
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        if not self.budget.try_spend():
+            self._count('budget_denied')
+            return primary.result()
+
+        self._count('hedges')
+        logger.info(f"Primary call outstanding after {delay:.2f}s, sending hedge")
+        hedge = self._executor.submit(self._timed, func)
+        pending = {primary, hedge}
+        error = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is hedge:
+                        self._count('hedge_wins')
+                    return future.result()
+                # Keep the primary's error if both attempts fail
+                if error is None or future is primary:
+                    error = future.exception()
+
+        raise error
+
+    def get_stats(self) -> Dict:
+        """Hedge counts, wins, budget denials and the current hedge delay"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'hedges': self.hedges,
+                'hedgeWins': self.hedge_wins,
+                'budgetDenied': self.budget_denied,
+                'hedgeDelay': round(self.hedge_delay(), 3)
+            }
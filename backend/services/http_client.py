@@ -0,0 +1,139 @@
+import os
+import logging
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+class PoolStats:
+    """Thread-safe per-host connection pool counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, int]] = {}
+
+    def _record(self, host: str, counter: str):
+        with self._lock:
+            host_stats = self._hosts.setdefault(host, {'requests': 0, 'new_connections': 0, 'waits': 0})
+            host_stats[counter] += 1
+
+    def record_request(self, host: str):
+        self._record(host, 'requests')
+
+    def record_new_connection(self, host: str):
+        self._record(host, 'new_connections')
+
+    def record_wait(self, host: str):
+        self._record(host, 'waits')
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Return a copy of the counters, including derived pool hits"""
+        with self._lock:
+            snapshot = {}
+            for host, host_stats in self._hosts.items():
+                snapshot[host] = dict(host_stats)
+                snapshot[host]['hits'] = max(host_stats['requests'] - host_stats['new_connections'], 0)
+            return snapshot
+
+class _InstrumentedPoolMixin:
+    """Connection pool mixin that reports reuse, new connections and waits"""
+
+    stats: PoolStats = None
+
+    def _get_conn(self, timeout=None):
+        self.stats.record_request(self.host)
+        if self.pool is not None and self.pool.empty():
+            # Every connection is checked out, so this caller has to wait
+            self.stats.record_wait(self.host)
+        return super()._get_conn(timeout=timeout)
+
+    def _new_conn(self):
+        self.stats.record_new_connection(self.host)
+        return super()._new_conn()
+
+class _InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools feed a PoolStats instance"""
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        self._pool_classes = {
+            'http': type('InstrumentedHTTPConnectionPool', (_InstrumentedPoolMixin, HTTPConnectionPool), {'stats': stats}),
+            'https': type('InstrumentedHTTPSConnectionPool', (_InstrumentedPoolMixin, HTTPSConnectionPool), {'stats': stats}),
+        }
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
+
+class PooledHTTPClient:
+    """Shared keep-alive HTTP client with bounded per-host connection pools
+
+    A single ``requests.Session`` is shared by every thread in the process;
+    urllib3 keeps one pool per host, so repeat calls to RapidAPI and
+    OpenRouter reuse warm TCP/TLS connections instead of handshaking again.
+    """
+
+    def __init__(self, pool_maxsize: int = 7, pool_connections: int = 4, pool_block: bool = True,
+                 connect_timeout: float = 3.05, read_timeout: float = 15):
+        self.pool_maxsize = pool_maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.stats = PoolStats()
+
+        adapter = _InstrumentedAdapter(
+            self.stats,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def from_env(cls) -> 'PooledHTTPClient':
+        """Size the pools from the search fan-out and gunicorn worker settings
+
+        Each gunicorn worker owns its own pools, so HTTP_MAX_CONNECTIONS_PER_HOST
+        (if set) is a host-wide budget split across WEB_CONCURRENCY workers.
+        Otherwise every fan-out thread gets a connection plus some headroom.
+        """
+        fanout_workers = int(os.getenv('SEARCH_MAX_WORKERS', 5))
+        pool_maxsize = int(os.getenv('HTTP_POOL_MAXSIZE', fanout_workers + 2))
+
+        host_budget = os.getenv('HTTP_MAX_CONNECTIONS_PER_HOST')
+        if host_budget:
+            web_concurrency = max(int(os.getenv('WEB_CONCURRENCY', 1)), 1)
+            pool_maxsize = min(pool_maxsize, max(int(host_budget) // web_concurrency, 1))
+
+        return cls(
+            pool_maxsize=pool_maxsize,
+            pool_block=os.getenv('HTTP_POOL_BLOCK', 'true').lower() == 'true',
+            connect_timeout=float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05)),
+            read_timeout=float(os.getenv('HTTP_READ_TIMEOUT', 15))
+        )
+
+    def _timeout(self, read_timeout: Optional[float]) -> tuple:
+        return (self.connect_timeout, read_timeout if read_timeout is not None else self.read_timeout)
+
+    def get(self, url: str, read_timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """GET over a pooled keep-alive connection"""
+        return self.session.get(url, timeout=self._timeout(read_timeout), **kwargs)
+
+    def post(self, url: str, read_timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """POST over a pooled keep-alive connection"""
+        return self.session.post(url, timeout=self._timeout(read_timeout), **kwargs)
+
+    def get_stats(self) -> Dict:
+        """Pool configuration and per-host hit/new-connection/wait counters"""
+        return {
+            'poolMaxsize': self.pool_maxsize,
+            'connectTimeout': self.connect_timeout,
+            'readTimeout': self.read_timeout,
+            'hosts': self.stats.snapshot()
+        }
@@ -0,0 +1,50 @@
+import json
+import logging
+from typing import Any
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: `pip install orjson` for faster responses
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that writes responses straight to UTF-8 bytes
+
+    Uses orjson when it is installed and enabled, and otherwise a compact
+    stdlib encoder without ASCII escaping. Values orjson rejects (integers
+    beyond 64 bits, non-string keys) fall back to the stdlib encoder. Keys
+    keep their insertion order: sorting them only costs time.
+    """
+
+    ensure_ascii = False
+    sort_keys = False
+
+    def __init__(self, app, use_orjson: bool = True):
+        super().__init__(app)
+        self.use_orjson = use_orjson and orjson is not None
+        self.encoder = 'orjson' if self.use_orjson else 'stdlib'
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """Serialize ``obj`` to compact UTF-8 JSON"""
+        if self.use_orjson:
+            try:
+                return orjson.dumps(obj, default=self.default)
+            except (orjson.JSONEncodeError, TypeError) as e:
+                logger.debug(f"orjson could not encode response, using stdlib: {e}")
+        return json.dumps(
+            obj, default=self.default, ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def response(self, *args: Any, **kwargs: Any):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,121 @@
+import re
+import json
+import codecs
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+# Next structural character outside a string, and a complete string body
+STRUCTURE_PATTERN = re.compile(r'["{}\[\]]')
+STRING_BODY_PATTERN = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+WHITESPACE_AND_COMMAS = ' \t\n\r,'
+ELEMENT_END = ' \t\n\r,]'
+
+class JSONArrayNotFound(ValueError):
+    """Raised once a document has been read without an array at the requested path"""
+
+def iter_json_array(chunks: Iterable[bytes], path: Tuple[str, ...]) -> Iterator[Any]:
+    """Yield each element of the array at ``path`` (object keys) as the bytes arrive
+
+    Only the element being decoded is held in memory, so peak memory scales
+    with the largest element rather than the whole document. Everything
+    outside the array is skipped without being decoded. The remaining
+    chunks are drained once the array ends, so the connection can be reused.
+    Raises JSONArrayNotFound if the document has no array at ``path``, and
+    json.JSONDecodeError if an element is malformed.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    finished = False
+    keys = []  # Key of each open container: None for the root and inside arrays
+    in_array = []  # Whether each open container is an array
+    last_string = None
+    in_target = False
+
+    while True:
+        if in_target:
+            # Decode one element at a time, waiting for more bytes if it is cut off
+            while pos < len(buffer) and buffer[pos] in WHITESPACE_AND_COMMAS:
+                pos += 1
+            if pos < len(buffer):
+                if buffer[pos] == ']':
+                    for _ in chunks:
+                        pass
+                    return
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if finished:
+                        raise
+                else:
+                    # A number cut off by the chunk boundary ("9." of "9.5")
+                    # decodes early; only take values followed by a delimiter
+                    if end < len(buffer) and buffer[end] in ELEMENT_END:
+                        yield value
+                        pos = end
+                        continue
+                    if finished:
+                        raise json.JSONDecodeError('Unterminated array', buffer, end)
+        else:
+            # Walk the document structure until the target array opens
+            match = STRUCTURE_PATTERN.search(buffer, pos)
+            while match:
+                char = match.group()
+                pos = match.end()
+                if char == '"':
+                    body = STRING_BODY_PATTERN.match(buffer, pos)
+                    if body is None:
+                        pos -= 1  # The string continues in the next chunk
+                        break
+                    last_string = buffer[pos:body.end() - 1]
+                    pos = body.end()
+                elif char in '{[':
+                    key = None if (in_array and in_array[-1]) else last_string
+                    keys.append(key)
+                    in_array.append(char == '[')
+                    if char == '[' and tuple(keys[1:]) == path:
+                        in_target = True
+                        break
+                else:
+                    keys.pop()
+                    in_array.pop()
+                match = STRUCTURE_PATTERN.search(buffer, pos)
+            if in_target:
+                continue
+            if match is None:
+                pos = len(buffer)
+
+        if finished:
+            if in_target:
+                raise json.JSONDecodeError('Unterminated array', buffer, pos)
+            raise JSONArrayNotFound(f"No array at {'.'.join(path)}")
+
+        # Keep the unread tail and append the next chunk
+        buffer = buffer[pos:]
+        pos = 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            buffer += utf8.decode(b'', final=True)
+            finished = True
+        else:
+            buffer += utf8.decode(chunk)
+
+def prune(value: Any, spec: Any) -> Any:
+    """Keep only the keys named in ``spec``
+
+    ``spec`` maps each key to keep to ``True`` (keep the whole value) or to
+    a nested spec; a nested spec is applied to each element of a list.
+    """
+    if spec is True:
+        return value
+    if isinstance(value, list):
+        return [prune(item, spec) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: prune(value[key], sub_spec) for key, sub_spec in spec.items() if key in value}
+
+def extract_json_array(chunks: Iterable[bytes], path: Tuple[str, ...], spec: Dict) -> Iterator[Any]:
+    """``iter_json_array`` with each element pruned to ``spec`` as it is decoded"""
+    for value in iter_json_array(chunks, path):
+        yield prune(value, spec)
@@ -1,16 +1,35 @@
 import os
 import json
-import requests
 import logging
+import threading
 import time
 from typing import Dict, List, Optional, Any
+from .http_client import PooledHTTPClient
+from .query_parser import analyze_query, normalize_query
+from .result_cache import TTLCache
+from .shared_cache import TieredCache
 
 logger = logging.getLogger(__name__)
 
+# Read timeout for LLM calls, and the least time worth giving a query parse
+# before falling back to the heuristic parser
+LLM_READ_TIMEOUT = 30
+MIN_PARSE_TIMEOUT = 1.0
+
 class OpenRouterService:
     """Service for interacting with OpenRouter API for LLM processing"""
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[PooledHTTPClient] = None, query_cache=None,
+                 cache_ttl: float = 24 * 60 * 60, cache_max_entries: int = 1000):
+        self.http_client = http_client or PooledHTTPClient.from_env()
+        # Parsed search parameters by normalized query: an in-process LRU,
+        # optionally in front of a persistent cache (e.g. a SQLiteCache)
+        self.local_query_cache = TTLCache(max_entries=cache_max_entries, ttl=cache_ttl,
+                                          size_fn=lambda params: len(json.dumps(params)))
+        self.query_cache = (TieredCache(self.local_query_cache, query_cache)
+                            if query_cache is not None else self.local_query_cache)
+        self.llm_calls = 0
+        self._stats_lock = threading.Lock()
         self.api_key = os.getenv('OPENROUTER_API_KEY')
         self.base_url = "https://openrouter.ai/api/v1"
         self.model = os.getenv('OPENROUTER_MODEL', 'anthropic/claude-3-haiku')
@@ -25,7 +44,8 @@ class OpenRouterService:
         """Check if OpenRouter service is available"""
         return bool(self.api_key)
     
-    def _make_request(self, messages: List[Dict], max_tokens: int = 1000) -> Optional[str]:
+    def _make_request(self, messages: List[Dict], max_tokens: int = 1000,
+                      read_timeout: float = LLM_READ_TIMEOUT) -> Optional[str]:
         """Make a request to OpenRouter API"""
         if not self.api_key:
             logger.warning("OpenRouter API key not configured")
@@ -39,11 +59,11 @@ class OpenRouterService:
                 "temperature": 0.7
             }
             
-            response = requests.post(
+            response = self.http_client.post(
                 f"{self.base_url}/chat/completions",
                 headers=self.headers,
                 json=payload,
-                timeout=30
+                read_timeout=read_timeout
             )
             
             if response.status_code == 200:
@@ -57,8 +77,22 @@ class OpenRouterService:
             logger.error(f"OpenRouter request failed: {str(e)}")
             return None
     
-    def process_search_query(self, user_query: str) -> Optional[Dict]:
-        """Process natural language query and extract search parameters"""
+    def process_search_query(self, user_query: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Process natural language query and extract search parameters
+
+        ``timeout`` caps the LLM read timeout (e.g. a request's remaining
+        budget); with less than MIN_PARSE_TIMEOUT left the heuristic parse
+        is returned without calling the LLM.
+        """
+        cache_key = normalize_query(user_query)
+        cached_params = self.query_cache.get(cache_key)
+        if cached_params is not None:
+            return dict(cached_params)
+        
+        read_timeout = LLM_READ_TIMEOUT if timeout is None else min(timeout, LLM_READ_TIMEOUT)
+        if read_timeout < MIN_PARSE_TIMEOUT:
+            logger.warning(f"Only {max(read_timeout, 0):.2f}s left to parse the query, using the heuristic parser")
+            return self._fallback_query_processing(user_query)
         
         system_prompt = """You are an AI assistant that extracts Airbnb search parameters from natural language queries.
 
@@ -99,7 +133,9 @@ Return ONLY the JSON object, no other text."""
             {"role": "user", "content": user_query}
         ]
         
-        response = self._make_request(messages, max_tokens=500)
+        with self._stats_lock:
+            self.llm_calls += 1
+        response = self._make_request(messages, max_tokens=500, read_timeout=read_timeout)
         
         if response:
             try:
@@ -118,6 +154,9 @@ Return ONLY the JSON object, no other text."""
                 search_params.setdefault('infants', 0)
                 search_params.setdefault('pets', 0)
                 
+                # Only LLM results are worth caching; the fallback is cheap
+                self.query_cache.set(cache_key, search_params)
+                
                 return search_params
                 
             except json.JSONDecodeError as e:
@@ -129,150 +168,16 @@ Return ONLY the JSON object, no other text."""
         
         return self._fallback_query_processing(user_query)
     
+    def get_cache_stats(self) -> Dict:
+        """Parsed-query cache usage and hit counters, plus LLM calls made on misses"""
+        stats = self.query_cache.get_stats()
+        with self._stats_lock:
+            stats['llmCalls'] = self.llm_calls
+        return stats
+    
     def _fallback_query_processing(self, user_query: str) -> Dict:
         """Enhanced fallback method for query processing when LLM fails"""
-        import re
-        
-        query_lower = user_query.lower()
-        
-        # Enhanced location detection with aliases and abbreviations
-        location_map = {
-            'sf': 'San Francisco',
-            'nyc': 'New York',
-            'la': 'Los Angeles',
-            'vegas': 'Las Vegas',
-            'francisco': 'San Francisco',
-            'miami': 'Miami',
-            'york': 'New York',
-            'angeles': 'Los Angeles',
-            'chicago': 'Chicago',
-            'boston': 'Boston',
-            'seattle': 'Seattle',
-            'austin': 'Austin',
-            'dallas': 'Dallas',
-            'houston': 'Houston',
-            'denver': 'Denver',
-            'atlanta': 'Atlanta',
-            'texas': 'Texas',
-            'california': 'California',
-            'florida': 'Florida',
-            'colorado': 'Colorado',
-            'napa': 'Napa Valley',
-            'hamptons': 'The Hamptons',
-            'aspen': 'Aspen',
-            'tahoe': 'Lake Tahoe'
-        }
-        
-        location = "San Francisco"  # Default
-        for key, value in location_map.items():
-            if key in query_lower:
-                location = value
-                break
-        
-        # Enhanced number extraction (including written numbers)
-        number_words = {
-            'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
-            'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
-            'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14, 'fifteen': 15,
-            'sixteen': 16, 'seventeen': 17, 'eighteen': 18, 'nineteen': 19, 'twenty': 20
-        }
-        
-        # Extract numbers (digits first, then words)
-        numbers = re.findall(r'\d+', user_query)
-        bedrooms = None
-        guests = 2
-        
-        # Look for bedroom mentions
-        bedroom_match = re.search(r'(\d+)\s*bedroom', query_lower)
-        if bedroom_match:
-            bedrooms = int(bedroom_match.group(1))
-            guests = bedrooms * 2  # Estimate 2 guests per bedroom
-        
-        # Look for guest/people mentions
-        people_match = re.search(r'(\d+)\s*(people|person|guest)', query_lower)
-        if people_match:
-            guests = int(people_match.group(1))
-        
-        # Check for written numbers
-        for word, num in number_words.items():
-            if f"{word} bedroom" in query_lower:
-                bedrooms = num
-                guests = max(guests, num * 2)
-            elif f"{word} people" in query_lower or f"{word} person" in query_lower:
-                guests = num
-        
-        # If we found any numbers but no specific context, use the first one
-        if numbers and not bedrooms and not people_match:
-            first_num = int(numbers[0])
-            if first_num > 20:  # Likely a price, not guests
-                pass
-            else:
-                guests = first_num
-        
-        # Property type detection
-        property_types = {
-            'house': 'house',
-            'villa': 'villa',
-            'mansion': 'mansion',
-            'estate': 'estate',
-            'cabin': 'cabin',
-            'cottage': 'cottage',
-            'apartment': 'apartment',
-            'condo': 'apartment',
-            'loft': 'loft'
-        }
-        
-        property_type = None
-        for key, value in property_types.items():
-            if key in query_lower:
-                property_type = value
-                break
-        
-        # Amenity detection
-        amenities = []
-        amenity_keywords = {
-            'pool': 'pool',
-            'hot tub': 'hot tub',
-            'jacuzzi': 'hot tub',
-            'wifi': 'wifi',
-            'kitchen': 'kitchen',
-            'parking': 'parking',
-            'beach': 'beachfront',
-            'ocean': 'ocean view',
-            'mountain': 'mountain view'
-        }
-        
-        for keyword, amenity in amenity_keywords.items():
-            if keyword in query_lower:
-                amenities.append(amenity)
-        
-        # Build result
-        result = {
-            "location": location,
-            "adults": guests,
-            "children": 0,
-            "infants": 0,
-            "pets": 0,
-            "guests": guests
-        }
-        
-        if bedrooms:
-            result["bedrooms"] = bedrooms
-        if property_type:
-            result["property_type"] = property_type
-        if amenities:
-            result["amenities"] = amenities
-        
-        # Special requirements detection
-        special_requirements = []
-        if any(word in query_lower for word in ['luxury', 'luxurious', 'upscale']):
-            special_requirements.append('luxury')
-        if any(word in query_lower for word in ['wedding', 'reunion', 'group', 'party']):
-            special_requirements.append('large group')
-        if special_requirements:
-            result["special_requirements"] = special_requirements
-        
-        return result
+        return analyze_query(user_query).to_search_params()
     
     def enhance_search_results(self, user_query: str, properties_data: Dict) -> Dict:
         """Enhance search results with LLM insights"""
@@ -0,0 +1,125 @@
+import time
+import heapq
+import itertools
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+class PipelineStats:
+    """Items and time for each stage of a chain of generators
+
+    Each generator stage is timed only while it is producing its next item,
+    which includes the stages upstream of it; ``summary`` subtracts those
+    so every stage reports its own share. Sink and ``measure`` time is
+    measured directly.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, List] = {}  # name -> [items, seconds, is_sink]
+
+    def stage(self, name: str, iterable: Iterable) -> Iterator:
+        """Wrap one generator stage of the pipeline; wrap stages upstream first"""
+        # Registered now rather than on the first pull, which runs downstream first
+        record = self._stages.setdefault(name, [0, 0.0, False])
+        return self._timed(record, iter(iterable))
+
+    @staticmethod
+    def _timed(record: List, iterator: Iterator) -> Iterator:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                record[1] += time.perf_counter() - start
+                return
+            record[1] += time.perf_counter() - start
+            record[0] += 1
+            yield item
+
+    def drain(self, name: str, iterable: Iterable, sink: Any) -> Any:
+        """Feed every item into ``sink.append`` and return the sink"""
+        record = self._stages.setdefault(name, [0, 0.0, True])
+        append = sink.append
+        for item in iterable:
+            start = time.perf_counter()
+            append(item)
+            record[1] += time.perf_counter() - start
+            record[0] += 1
+        return sink
+
+    def measure(self, name: str, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a step over the whole result set at once (e.g. a columnar filter)"""
+        start = time.perf_counter()
+        result = func(*args)
+        self._stages[name] = [len(result), time.perf_counter() - start, True]
+        return result
+
+    def summary(self) -> Dict[str, Dict]:
+        """Items out of and milliseconds spent in each stage, in pipeline order"""
+        summary = {}
+        upstream = 0.0
+        for name, (items, seconds, is_sink) in self._stages.items():
+            own = seconds if is_sink else seconds - upstream
+            if not is_sink:
+                upstream = seconds
+            summary[name] = {'items': items, 'ms': round(max(own, 0.0) * 1000, 2)}
+        return summary
+
+class TopKSink:
+    """Keeps the first ``limit`` items in ``key`` order, counting every item
+
+    Memory stays bounded by ``limit`` however many items arrive. Ties keep
+    arrival order, as a stable sort would. With no ``limit`` every item is
+    kept and sorted at the end; with no ``key`` arrival order is used.
+    """
+
+    def __init__(self, limit: Optional[int] = None, key: Optional[Callable[[Any], Any]] = None,
+                 reverse: bool = False):
+        self.limit = limit
+        self.key = key
+        self.reverse = reverse
+        self.total = 0
+        self._heap = []
+        self._items = []
+        self._sequence = itertools.count()
+
+    def append(self, item: Any):
+        self.total += 1
+        if self.limit is None:
+            self._items.append(item)
+            return
+        if self.limit <= 0:
+            return
+
+        value = self.key(item) if self.key else 0
+        seq = next(self._sequence)
+        # The heap root is the worst item kept: the largest (value, seq) when
+        # ascending, the smallest value (latest seq on ties) when descending
+        entry = (value, -seq, item) if self.reverse else (_Negated(value), -seq, item)
+        if len(self._heap) < self.limit:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def results(self) -> List:
+        """Kept items, best first"""
+        if self.limit is None:
+            if self.key is None:
+                return list(self._items)
+            return sorted(self._items, key=self.key, reverse=self.reverse)
+        return [item for *_, item in sorted(self._heap, reverse=True)]
+
+class _Negated:
+    """Reverses the ordering of a value, so a min-heap keeps the largest"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __lt__(self, other: '_Negated') -> bool:
+        return other.value < self.value
+
+    def __gt__(self, other: '_Negated') -> bool:
+        return other.value > self.value
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Negated) and other.value == self.value
@@ -0,0 +1,107 @@
+import sys
+import heapq
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+from .property_record import PROPERTY_FIELDS, Property
+
+# Numeric columns: name, array typecode, and the type handed back to callers
+NUMERIC_COLUMNS = (
+    ('price', 'd', int),
+    ('rating', 'd', float),
+    ('reviewCount', 'q', int),
+    ('guests', 'q', int),
+    ('bedrooms', 'q', int),
+    ('bathrooms', 'q', int)
+)
+STRING_COLUMNS = ('id', 'title', 'currency', 'imageUrl', 'location', 'url', 'type', 'source')
+
+# Low-cardinality strings shared by many listings; stored once per distinct value
+INTERNED_COLUMNS = frozenset({'currency', 'location', 'type', 'source'})
+
+# Columns are named by JSON key, in the order Property.to_dict uses
+FIELD_ORDER = tuple(name for name, _ in PROPERTY_FIELDS)
+FIELD_ATTRIBUTES = dict(PROPERTY_FIELDS)
+
+# How each column is handed back to callers
+CASTS = {name: cast for name, _, cast in NUMERIC_COLUMNS}
+CASTS['amenities'] = list
+
+MAX_COUNT = 2 ** 63 - 1
+
+class PropertyBatch:
+    """Transformed properties stored column by column
+
+    Numbers live in typed ``array`` columns and repeated strings and amenity
+    lists are shared, so a large merged result set costs a few machine words
+    per listing instead of a Property record. Sorting and top-k work on row
+    indices keyed by the price column; dicts are only rebuilt by
+    ``to_dicts`` for the rows being returned.
+    """
+
+    def __init__(self):
+        self.columns = {name: array(typecode) for name, typecode, _ in NUMERIC_COLUMNS}
+        self.columns.update({name: [] for name in STRING_COLUMNS})
+        self.columns['amenities'] = []
+        self._amenity_sets = {}
+
+    def __len__(self) -> int:
+        return len(self.columns['id'])
+
+    @classmethod
+    def from_properties(cls, properties: Iterable[Property]) -> 'PropertyBatch':
+        batch = cls()
+        for prop in properties:
+            batch.append(prop)
+        return batch
+
+    def append(self, prop: Property):
+        """Add one transformed property"""
+        columns = self.columns
+        for name, typecode, _ in NUMERIC_COLUMNS:
+            value = getattr(prop, FIELD_ATTRIBUTES[name]) or 0
+            columns[name].append(min(value, MAX_COUNT) if typecode == 'q' else value)
+        for name in STRING_COLUMNS:
+            value = str(getattr(prop, FIELD_ATTRIBUTES[name]))
+            columns[name].append(sys.intern(value) if name in INTERNED_COLUMNS else value)
+        amenities = tuple(prop.amenities)
+        columns['amenities'].append(self._amenity_sets.setdefault(amenities, amenities))
+
+    def take(self, indices: Sequence[int]) -> 'PropertyBatch':
+        """New batch holding the given rows, in the given order"""
+        batch = PropertyBatch()
+        batch._amenity_sets = self._amenity_sets
+        for name, column in self.columns.items():
+            values = [column[i] for i in indices]
+            if isinstance(column, array):
+                batch.columns[name] = array(column.typecode, values)
+            else:
+                batch.columns[name] = values
+        return batch
+
+    def select(self, sort_by: Optional[str] = None, offset: int = 0, limit: Optional[int] = None) -> List[int]:
+        """Row indices of one page in ``sort_by`` order ('price_asc', 'price_desc' or None)
+
+        With a ``limit``, only the first ``offset + limit`` rows are selected,
+        with a heap. Ties keep their original order, so pages never overlap.
+        """
+        rows = range(len(self))
+        stop = None if limit is None else offset + limit
+        if sort_by not in ('price_asc', 'price_desc'):
+            return list(rows[offset:stop])
+
+        key = self.columns['price'].tolist().__getitem__
+        if sort_by == 'price_asc':
+            ordered = sorted(rows, key=key) if stop is None else heapq.nsmallest(stop, rows, key=key)
+        else:
+            ordered = sorted(rows, key=key, reverse=True) if stop is None else heapq.nlargest(stop, rows, key=key)
+        return ordered[offset:]
+
+    def to_dicts(self, indices: Optional[Iterable[int]] = None) -> List[Dict]:
+        """Rebuild property dicts for the given rows (all rows by default)"""
+        if indices is None:
+            indices = range(len(self))
+        fields = [(name, self.columns[name], CASTS.get(name)) for name in FIELD_ORDER]
+        return [
+            {name: (cast(column[i]) if cast else column[i]) for name, column, cast in fields}
+            for i in indices
+        ]
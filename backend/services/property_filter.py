@@ -0,0 +1,126 @@
+import math
+import logging
+from typing import Dict, Iterable, List, Tuple
+from .property_batch import PropertyBatch
+from .property_record import DEFAULT_AMENITIES, Property
+
+logger = logging.getLogger(__name__)
+
+# Words in a listing's type ("Home in Austin", "Room in Paris") for each
+# property type the client can filter on
+PROPERTY_TYPE_KEYWORDS = {
+    'entire_house': ('entire', 'home', 'house', 'villa', 'cabin', 'cottage', 'bungalow', 'chalet'),
+    'private_room': ('private room', 'room in'),
+    'shared_room': ('shared',),
+    'apartment': ('apartment', 'condo', 'flat', 'loft', 'rental unit'),
+    'villa': ('villa',)
+}
+
+# RapidAPI has no room-type field, so "Private room in home" would match
+# entire_house on 'home'; listings with these words are left out instead
+PROPERTY_TYPE_EXCLUDES = {
+    'entire_house': ('room',)
+}
+
+class PropertyFilter:
+    """Validated client filters, compiled once per request
+
+    Price bounds are pushed into the RapidAPI call through
+    ``upstream_params``; they are still checked locally, together with
+    amenities and property types, in one pass by ``apply``. Listings whose
+    amenities were not extracted (still the DEFAULT_AMENITIES placeholder)
+    pass the amenity filter, since nothing is known about them; when that
+    happens ``skipped_filters`` reports it so responses can say so.
+    """
+
+    def __init__(self, filters: Dict):
+        filters = filters or {}
+        self.price_min = filters.get('priceMin')
+        self.price_max = filters.get('priceMax')
+        self.amenities = frozenset(amenity.lower() for amenity in filters.get('amenities', ()))
+        self.type_rules: Tuple[Tuple[Tuple[str, ...], Tuple[str, ...]], ...] = tuple(
+            (PROPERTY_TYPE_KEYWORDS[property_type], PROPERTY_TYPE_EXCLUDES.get(property_type, ()))
+            for property_type in filters.get('propertyTypes', ())
+            if property_type in PROPERTY_TYPE_KEYWORDS
+        )
+        self.amenities_skipped = False
+
+    @property
+    def active(self) -> bool:
+        return bool(self.price_min or self.price_max or self.amenities or self.type_rules)
+
+    def skipped_filters(self) -> List[str]:
+        """Requested filters that could not be checked for some listings"""
+        return ['amenities'] if self.amenities_skipped else []
+
+    def upstream_params(self) -> Dict:
+        """call_airbnb_search price arguments, rounded outwards so RapidAPI never drops a local match"""
+        params = {}
+        if self.price_min:
+            params['min_price'] = math.floor(self.price_min)
+        if self.price_max:
+            params['max_price'] = math.ceil(self.price_max)
+        return params
+
+    def has_amenities(self, amenities) -> bool:
+        if amenities == DEFAULT_AMENITIES:
+            self.amenities_skipped = True
+            return True
+        return self.amenities <= {amenity.lower() for amenity in amenities}
+
+    def matches_type(self, listing_type: str) -> bool:
+        listing_type = listing_type.lower()
+        return any(
+            any(keyword in listing_type for keyword in keywords)
+            and not any(word in listing_type for word in excludes)
+            for keywords, excludes in self.type_rules
+        )
+
+    def matches(self, prop: Property) -> bool:
+        if self.price_min and prop.price < self.price_min:
+            return False
+        if self.price_max and prop.price > self.price_max:
+            return False
+        if self.amenities and not self.has_amenities(prop.amenities):
+            return False
+        if self.type_rules and not self.matches_type(prop.type):
+            return False
+        return True
+
+    def apply(self, properties: Iterable[Property]) -> List[Property]:
+        """Properties that pass every filter, in their original order"""
+        properties = list(properties)
+        if not self.active:
+            return properties
+
+        kept = [prop for prop in properties if self.matches(prop)]
+        logger.info(f"Filters kept {len(kept)} of {len(properties)} properties")
+        return kept
+
+    def apply_batch(self, batch: PropertyBatch) -> PropertyBatch:
+        """``apply`` for a PropertyBatch, one column at a time
+
+        Amenity and type checks run once per distinct value rather than once
+        per listing.
+        """
+        if not self.active:
+            return batch
+
+        columns = batch.columns
+        rows = range(len(batch))
+        price = columns['price']
+        if self.price_min:
+            rows = [i for i in rows if price[i] >= self.price_min]
+        if self.price_max:
+            rows = [i for i in rows if price[i] <= self.price_max]
+        if self.amenities:
+            amenities = columns['amenities']
+            has_amenities = {value: self.has_amenities(value) for value in {amenities[i] for i in rows}}
+            rows = [i for i in rows if has_amenities[amenities[i]]]
+        if self.type_rules:
+            types = columns['type']
+            type_matches = {value: self.matches_type(value) for value in {types[i] for i in rows}}
+            rows = [i for i in rows if type_matches[types[i]]]
+
+        logger.info(f"Filters kept {len(rows)} of {len(batch)} properties")
+        return batch.take(rows)
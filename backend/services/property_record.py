@@ -0,0 +1,70 @@
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+DEFAULT_CURRENCY = 'USD'
+DEFAULT_SOURCE = 'real_airbnb_rapidapi'
+DEFAULT_AMENITIES = ('WiFi', 'Kitchen')
+
+# JSON key of each field, in the order the API has always returned them
+PROPERTY_FIELDS = (
+    ('id', 'id'), ('title', 'title'), ('price', 'price'), ('currency', 'currency'),
+    ('rating', 'rating'), ('reviewCount', 'review_count'), ('imageUrl', 'image_url'),
+    ('location', 'location'), ('url', 'url'), ('type', 'type'), ('guests', 'guests'),
+    ('source', 'source'), ('bedrooms', 'bedrooms'), ('bathrooms', 'bathrooms'),
+    ('amenities', 'amenities')
+)
+
+@dataclass(frozen=True, slots=True)
+class Property:
+    """One transformed listing
+
+    Slotted and immutable, so a listing carries no per-instance dict, and
+    the constant fields and default amenities are shared by every listing.
+    ``to_dict`` produces the API's JSON shape.
+    """
+    id: str
+    title: str
+    price: int
+    rating: float
+    review_count: int
+    image_url: str
+    location: str
+    url: str
+    type: str
+    currency: str = DEFAULT_CURRENCY
+    guests: int = 2
+    source: str = DEFAULT_SOURCE
+    bedrooms: int = 1
+    bathrooms: int = 1
+    amenities: Tuple[str, ...] = DEFAULT_AMENITIES
+
+    @classmethod
+    def create(cls, **fields) -> 'Property':
+        """Build a Property, interning the low-cardinality location and type strings"""
+        fields['location'] = sys.intern(fields['location'])
+        fields['type'] = sys.intern(fields['type'])
+        return cls(**fields)
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'title': self.title,
+            'price': self.price,
+            'currency': self.currency,
+            'rating': self.rating,
+            'reviewCount': self.review_count,
+            'imageUrl': self.image_url,
+            'location': self.location,
+            'url': self.url,
+            'type': self.type,
+            'guests': self.guests,
+            'source': self.source,
+            'bedrooms': self.bedrooms,
+            'bathrooms': self.bathrooms,
+            'amenities': list(self.amenities)
+        }
+
+def serialize_properties(properties: Iterable[Property]) -> List[Dict]:
+    """Property records as JSON-ready dicts"""
+    return [prop.to_dict() for prop in properties]
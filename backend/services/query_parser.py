@@ -0,0 +1,357 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from .gazetteer import gazetteer
+
+# Queries asking for a worldwide search, and the cities searched for them
+GLOBAL_QUERY_PATTERN = re.compile(
+    r'globally|worldwide|international|anywhere'
+    r'|best.*in.*world|cheapest.*globally|most.*expensive.*worldwide'
+    r'|across.*countries|multiple.*countries|different.*countries'
+)
+GLOBAL_CITIES = ('new york', 'london', 'paris', 'tokyo', 'sydney')
+
+# Regions and the cities searched for them (top 5 of each), checked in order
+REGION_CITIES = {
+    'europe': ('london', 'paris', 'barcelona', 'rome', 'amsterdam', 'berlin', 'madrid', 'vienna', 'prague'),
+    'asia': ('tokyo', 'singapore', 'hong kong', 'seoul', 'bangkok', 'mumbai', 'delhi'),
+    'americas': ('new york', 'los angeles', 'mexico city', 'sao paulo', 'buenos aires'),
+    'north america': ('new york', 'los angeles', 'chicago', 'mexico city'),
+    'south america': ('sao paulo', 'rio de janeiro', 'buenos aires'),
+}
+
+# Sort and size criteria
+BUDGET_PATTERN = re.compile(r'cheapest|budget|affordable|lowest.?price')
+LUXURY_PATTERN = re.compile(r'most.?expensive|luxury|highest.?price|premium')
+LARGE_PATTERN = re.compile(r'large|big|huge|massive|spacious')
+SMALL_PATTERN = re.compile(r'small|tiny|compact|cozy')
+
+# Keywords that introduce a location, in priority order, followed by the
+# "<noun> in" forms, which are only consulted once no plain keyword phrase
+# yields a usable location
+LOCATION_KEYWORDS = ('in', 'near', 'around', 'at', 'to', 'from', 'visit', 'explore')
+LOCATION_NOUNS = ('stay', 'places', 'accommodation', 'hotel', 'apartment', 'room', 'house')
+
+# Common non-location words dropped from an extracted phrase
+LOCATION_SKIP_WORDS = frozenset({
+    'a', 'an', 'the', 'big', 'small', 'nice', 'good', 'great', 'beautiful',
+    'cheap', 'expensive', 'luxury', 'budget', 'find', 'looking', 'search',
+    'apartment', 'house', 'room', 'place', 'hotel', 'accommodation',
+    'stay', 'night', 'week', 'month', 'vacation', 'holiday', 'trip',
+    'family', 'couple', 'group', 'people', 'person', 'guest', 'guests',
+    'bedroom', 'bathroom', 'kitchen', 'pool', 'wifi', 'parking'
+})
+
+# One scan finds every keyword, as "<noun> in" where a noun precedes the
+# "in"; the leading lookahead lets the scan skip other characters quickly
+LOCATION_KEYWORD_PATTERN = re.compile(
+    r'(?=[inatfvesphr])(?:'
+    r'(stay|places?|accommodation|hotel|apartment|room|house)\s+(in)\s+'
+    r'|(in|near|around|at|to|from|visit|explore)\s+)'
+)
+LOCATION_PHRASE_RANKS = {keyword: rank for rank, keyword in enumerate(LOCATION_KEYWORDS)}
+LOCATION_PHRASE_RANKS.update(
+    (noun, len(LOCATION_KEYWORDS) + rank) for rank, noun in enumerate(LOCATION_NOUNS)
+)
+LOCATION_PHRASE_RANKS['place'] = LOCATION_PHRASE_RANKS['places']
+
+# A location phrase ends at sentence punctuation or at a comma that isn't
+# followed by more text
+LOCATION_STOP_PATTERN = re.compile(r'[.?!]|,(?=[,.?!]|$)')
+LOCATION_STOP_CHARS = ',.?!'
+HAS_LETTER_PATTERN = re.compile(r'[a-zA-Z]')
+
+# Tables for the keyword-based search parameters used when the LLM is
+# unavailable. Location aliases are matched against whole words, so "la"
+# no longer matches inside "place", and are preferred over the extracted
+# location phrase; the rest keep substring matching so plurals such as
+# "villas" still count. Earlier entries win.
+FALLBACK_LOCATION_ALIASES = {
+    'sf': 'San Francisco',
+    'nyc': 'New York',
+    'la': 'Los Angeles',
+    'vegas': 'Las Vegas',
+    'francisco': 'San Francisco',
+    'miami': 'Miami',
+    'york': 'New York',
+    'angeles': 'Los Angeles',
+    'chicago': 'Chicago',
+    'boston': 'Boston',
+    'seattle': 'Seattle',
+    'austin': 'Austin',
+    'dallas': 'Dallas',
+    'houston': 'Houston',
+    'denver': 'Denver',
+    'atlanta': 'Atlanta',
+    'texas': 'Texas',
+    'california': 'California',
+    'florida': 'Florida',
+    'colorado': 'Colorado',
+    'napa': 'Napa Valley',
+    'hamptons': 'The Hamptons',
+    'aspen': 'Aspen',
+    'tahoe': 'Lake Tahoe'
+}
+FALLBACK_DEFAULT_LOCATION = 'San Francisco'
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+    'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14, 'fifteen': 15,
+    'sixteen': 16, 'seventeen': 17, 'eighteen': 18, 'nineteen': 19, 'twenty': 20
+}
+
+PROPERTY_TYPES = {
+    'house': 'house',
+    'villa': 'villa',
+    'mansion': 'mansion',
+    'estate': 'estate',
+    'cabin': 'cabin',
+    'cottage': 'cottage',
+    'apartment': 'apartment',
+    'condo': 'apartment',
+    'loft': 'loft'
+}
+
+AMENITY_KEYWORDS = {
+    'pool': 'pool',
+    'hot tub': 'hot tub',
+    'jacuzzi': 'hot tub',
+    'wifi': 'wifi',
+    'kitchen': 'kitchen',
+    'parking': 'parking',
+    'beach': 'beachfront',
+    'ocean': 'ocean view',
+    'mountain': 'mountain view'
+}
+
+SPECIAL_REQUIREMENT_WORDS = {
+    'luxury': ('luxury', 'luxurious', 'upscale'),
+    'large group': ('wedding', 'reunion', 'group', 'party'),
+}
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s$]')
+NUMBER_PATTERN = re.compile(r'\d+')
+BEDROOM_PATTERN = re.compile(r'(\d+)\s*bedroom')
+PEOPLE_PATTERN = re.compile(r'(\d+)\s*(people|person|guest)')
+
+@dataclass(frozen=True)
+class ParsedQuery:
+    """Everything the heuristic extractors read from one search query
+
+    Built once per normalized query by ``analyze_query`` and shared (and
+    cached), so it is immutable; callers get fresh lists and dicts from its
+    accessors.
+    """
+    text: str
+    location: str
+    locations: Tuple[str, ...]
+    region: Optional[str] = None
+    sort_by: Optional[str] = None
+    price_preference: Optional[str] = None
+    property_size: Optional[str] = None
+    fallback_location: Optional[str] = None
+    guests: int = 2
+    bedrooms: Optional[int] = None
+    property_type: Optional[str] = None
+    amenities: Tuple[str, ...] = ()
+    special_requirements: Tuple[str, ...] = ()
+
+    @property
+    def criteria(self) -> Dict:
+        """Sort and size criteria in the shape the search routes use"""
+        return {
+            'sort_by': self.sort_by,
+            'property_size': self.property_size,
+            'price_preference': self.price_preference
+        }
+
+    def to_search_params(self) -> Dict:
+        """Search parameters in the shape the LLM returns, for when it is unavailable"""
+        result = {
+            "location": self.fallback_location or FALLBACK_DEFAULT_LOCATION,
+            "adults": self.guests,
+            "children": 0,
+            "infants": 0,
+            "pets": 0,
+            "guests": self.guests
+        }
+        if self.bedrooms:
+            result["bedrooms"] = self.bedrooms
+        if self.property_type:
+            result["property_type"] = self.property_type
+        if self.amenities:
+            result["amenities"] = list(self.amenities)
+        if self.special_requirements:
+            result["special_requirements"] = list(self.special_requirements)
+        return result
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a query for caching LLM results
+
+    Lowercases, turns punctuation into spaces (keeping ``$``), spells number
+    words as digits and collapses whitespace, so "Two-bedroom flat in Paris!"
+    and "2 bedroom flat in paris" share one entry.
+    """
+    words = PUNCTUATION_PATTERN.sub(' ', query.lower()).split()
+    return ' '.join(str(NUMBER_WORDS.get(word, word)) for word in words)
+
+def clean_location_phrase(phrase: str) -> Optional[str]:
+    """Drop filler words and title-case the rest, or return None if nothing usable is left"""
+    location_words = [word for word in phrase.split() if word not in LOCATION_SKIP_WORDS]
+    if location_words and len(' '.join(location_words)) >= 2:
+        cleaned_location = ' '.join(map(str.capitalize, location_words))
+        if HAS_LETTER_PATTERN.search(cleaned_location):
+            return cleaned_location
+    return None
+
+def extract_location(text: str) -> str:
+    """Location named in a lowercased, stripped query, or 'United States'
+
+    Scans the query once, then takes the phrase after each location keyword
+    (in keyword priority order), falling back to the trailing phrase of the
+    query. A phrase runs up to the next stop point.
+    """
+    length = len(text)
+
+    # (rank, keyword start, phrase start) for every keyword occurrence
+    hits = []
+    for match in LOCATION_KEYWORD_PATTERN.finditer(text):
+        noun, _, keyword = match.groups()
+        phrase_start = match.end()
+        if noun:
+            hits.append((LOCATION_PHRASE_RANKS['in'], match.start(2), phrase_start))
+            hits.append((LOCATION_PHRASE_RANKS[noun], match.start(), phrase_start))
+        else:
+            hits.append((LOCATION_PHRASE_RANKS[keyword], match.start(), phrase_start))
+    hits.sort()
+
+    # Within one keyword, phrases don't overlap: a keyword inside an earlier
+    # phrase is skipped, as re.findall would
+    current_rank = resume_at = -1
+    for rank, keyword_start, phrase_start in hits:
+        if rank != current_rank:
+            current_rank, resume_at = rank, 0
+        if keyword_start < resume_at:
+            continue
+        if phrase_start == length or text[phrase_start] in LOCATION_STOP_CHARS:
+            # The phrase can't start on a stop character; it can only
+            # borrow the last of several whitespace characters
+            if not text[phrase_start - 2].isspace():
+                continue
+            phrase_start -= 1
+        stop = LOCATION_STOP_PATTERN.search(text, phrase_start)
+        phrase_end = stop.start() if stop else length
+        resume_at = phrase_end
+
+        location = clean_location_phrase(text[phrase_start:phrase_end].strip())
+        if location:
+            return location
+
+    # Location at end of query: everything after the last stop point
+    phrase_start = 0
+    for stop in LOCATION_STOP_PATTERN.finditer(text):
+        phrase_start = stop.end()
+    if phrase_start < length and text[phrase_start] == ',':
+        phrase_start += 1
+    if phrase_start < length:
+        location = clean_location_phrase(text[phrase_start:].strip())
+        if location:
+            return location
+
+    # Final fallback - return a generic location
+    return 'United States'
+
+def _extract_guests_and_bedrooms(text: str) -> Tuple[int, Optional[int]]:
+    """Guest count (default 2) and bedroom count from digits and number words"""
+    bedrooms = None
+    guests = 2
+
+    # Look for bedroom mentions
+    bedroom_match = BEDROOM_PATTERN.search(text)
+    if bedroom_match:
+        bedrooms = int(bedroom_match.group(1))
+        guests = bedrooms * 2  # Estimate 2 guests per bedroom
+
+    # Look for guest/people mentions
+    people_match = PEOPLE_PATTERN.search(text)
+    if people_match:
+        guests = int(people_match.group(1))
+
+    # Check for written numbers
+    for word, num in NUMBER_WORDS.items():
+        if word not in text:
+            continue
+        if f"{word} bedroom" in text:
+            bedrooms = num
+            guests = max(guests, num * 2)
+        elif f"{word} people" in text or f"{word} person" in text:
+            guests = num
+
+    # If we found any numbers but no specific context, use the first one
+    if not bedrooms and not people_match:
+        first_number = NUMBER_PATTERN.search(text)
+        if first_number and int(first_number.group()) <= 20:  # Larger numbers are likely prices
+            guests = int(first_number.group())
+
+    return guests, bedrooms
+
+@lru_cache(maxsize=1024)
+def _analyze(text: str) -> ParsedQuery:
+    words = set(WORD_PATTERN.findall(text))
+
+    location = extract_location(text)
+    region = None
+    if GLOBAL_QUERY_PATTERN.search(text):
+        region, locations = 'global', GLOBAL_CITIES
+    else:
+        for name, cities in REGION_CITIES.items():
+            if name in text:
+                region, locations = name, cities[:5]
+                break
+        else:
+            locations = (location,)
+
+    sort_by = price_preference = property_size = None
+    if BUDGET_PATTERN.search(text):
+        sort_by, price_preference = 'price_asc', 'budget'
+    elif LUXURY_PATTERN.search(text):
+        sort_by, price_preference = 'price_desc', 'luxury'
+    if LARGE_PATTERN.search(text):
+        property_size = 'large'
+    elif SMALL_PATTERN.search(text):
+        property_size = 'small'
+
+    fallback_location = next((value for key, value in FALLBACK_LOCATION_ALIASES.items() if key in words), None)
+    if fallback_location is None and gazetteer.is_known_location(location):
+        fallback_location = location
+    guests, bedrooms = _extract_guests_and_bedrooms(text)
+
+    return ParsedQuery(
+        text=text,
+        location=location,
+        locations=locations,
+        region=region,
+        sort_by=sort_by,
+        price_preference=price_preference,
+        property_size=property_size,
+        fallback_location=fallback_location,
+        guests=guests,
+        bedrooms=bedrooms,
+        property_type=next((value for key, value in PROPERTY_TYPES.items() if key in text), None),
+        amenities=tuple(amenity for keyword, amenity in AMENITY_KEYWORDS.items() if keyword in text),
+        special_requirements=tuple(
+            requirement for requirement, triggers in SPECIAL_REQUIREMENT_WORDS.items()
+            if any(word in text for word in triggers)
+        )
+    )
+
+def analyze_query(query: str) -> ParsedQuery:
+    """Parse a search query once for every heuristic extractor
+
+    Results are cached by the lowercased, stripped query, which is all the
+    extractors look at.
+    """
+    return _analyze(query.lower().strip())
@@ -0,0 +1,298 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would exceed the upstream plan, before it is sent"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def _thread_connection(local: threading.local, path: str, schema: str) -> sqlite3.Connection:
+    """This thread's connection to the shared SQLite file, reopened after a fork"""
+    conn = getattr(local, 'conn', None)
+    if conn is not None and local.pid == os.getpid():
+        return conn
+
+    conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(schema)
+    local.conn = conn
+    local.pid = os.getpid()
+    return conn
+
+def current_month() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m')
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``rate`` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.time()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens: float, updated_at: float, now: float) -> tuple:
+        """Refill, then take one token if possible
+
+        Returns ``(tokens, updated_at, wait)`` where ``wait`` is how long until
+        a token is available (0 when one was taken).
+        """
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, now, 0.0
+        return tokens, now, (1 - tokens) / self.rate
+
+    def _try_acquire(self) -> float:
+        with self._lock:
+            self._tokens, self._updated_at, wait = self._take(self._tokens, self._updated_at, time.time())
+            return wait
+
+    def acquire(self, max_wait: float = 0) -> None:
+        """Take a token, queueing for up to ``max_wait`` seconds, else raise RateLimitExceeded"""
+        give_up_at = time.monotonic() + max_wait
+        while True:
+            wait = self._try_acquire()
+            if wait == 0:
+                return
+            if time.monotonic() + wait > give_up_at:
+                raise RateLimitExceeded(f"Local rate limit of {self.rate}/s reached", retry_after=wait)
+            time.sleep(wait)
+
+    def available(self) -> float:
+        """Tokens available right now"""
+        with self._lock:
+            return min(self.capacity, self._tokens + (time.time() - self._updated_at) * self.rate)
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket whose state lives in a SQLite file shared by every worker on the host"""
+
+    def __init__(self, rate: float, capacity: float, path: str, name: str = 'rapidapi'):
+        super().__init__(rate, capacity)
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        return _thread_connection(
+            self._local, self.path,
+            'CREATE TABLE IF NOT EXISTS rate_limit ('
+            ' name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+
+    def _try_acquire(self) -> float:
+        try:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT tokens, updated_at FROM rate_limit WHERE name = ?', (self.name,)).fetchone()
+                now = time.time()
+                tokens, updated_at = row if row else (self.capacity, now)
+                tokens, updated_at, wait = self._take(tokens, updated_at, now)
+                conn.execute(
+                    'INSERT OR REPLACE INTO rate_limit (name, tokens, updated_at) VALUES (?, ?, ?)',
+                    (self.name, tokens, updated_at)
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            with self._lock:
+                self._tokens, self._updated_at = tokens, updated_at
+            return wait
+        except sqlite3.Error as e:
+            # Fall back to this worker's own bucket rather than failing the search
+            logger.warning(f"Shared rate limiter unavailable, using local bucket: {e}")
+            return super()._try_acquire()
+
+    def available(self) -> float:
+        """Tokens left in the shared bucket right now"""
+        try:
+            row = self._connection().execute(
+                'SELECT tokens, updated_at FROM rate_limit WHERE name = ?', (self.name,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared rate limiter unavailable, using local bucket: {e}")
+            return super().available()
+        if row is None:
+            return self.capacity
+        tokens, updated_at = row
+        return min(self.capacity, tokens + (time.time() - updated_at) * self.rate)
+
+class MonthlyUsage:
+    """Thread-safe count of upstream calls made in the current UTC month"""
+
+    def __init__(self):
+        self._month = current_month()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def _roll_over(self, month: str):
+        if self._month != month:
+            self._month = month
+            self._used = 0
+
+    def used(self) -> int:
+        with self._lock:
+            self._roll_over(current_month())
+            return self._used
+
+    def add(self):
+        with self._lock:
+            self._roll_over(current_month())
+            self._used += 1
+
+class SharedMonthlyUsage(MonthlyUsage):
+    """Monthly call count kept in a SQLite file shared by every worker on the host
+
+    Use the same file as the SharedTokenBucket so both limits cover the
+    whole host rather than each gunicorn worker.
+    """
+
+    def __init__(self, path: str, name: str = 'rapidapi'):
+        super().__init__()
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        return _thread_connection(
+            self._local, self.path,
+            'CREATE TABLE IF NOT EXISTS monthly_usage ('
+            ' name TEXT NOT NULL, month TEXT NOT NULL, used INTEGER NOT NULL, PRIMARY KEY (name, month))'
+        )
+
+    def used(self) -> int:
+        try:
+            row = self._connection().execute(
+                'SELECT used FROM monthly_usage WHERE name = ? AND month = ?', (self.name, current_month())
+            ).fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error as e:
+            # Fall back to this worker's own count rather than failing the search
+            logger.warning(f"Shared monthly usage unavailable, using local count: {e}")
+            return super().used()
+
+    def add(self):
+        super().add()
+        try:
+            self._connection().execute(
+                'INSERT INTO monthly_usage (name, month, used) VALUES (?, ?, 1)'
+                ' ON CONFLICT (name, month) DO UPDATE SET used = used + 1',
+                (self.name, current_month())
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Shared monthly usage unavailable, using local count: {e}")
+
+class UpstreamRateLimiter:
+    """Client-side guard for an upstream plan's request rate and monthly quota
+
+    Calls are admitted by a token bucket (queueing briefly, or rejected
+    early) and blocked outright while the upstream has told us to back off
+    through ``Retry-After`` or while the monthly quota is used up. The
+    quota comes from ``X-RateLimit-Requests-*`` response headers when the
+    upstream sends them, and from ``usage`` otherwise; pass a
+    SharedMonthlyUsage (with a SharedTokenBucket) to count across workers.
+    """
+
+    def __init__(self, bucket: TokenBucket, monthly_quota: Optional[int] = None, max_wait: float = 1.0,
+                 usage: Optional[MonthlyUsage] = None):
+        self.bucket = bucket
+        self.monthly_quota = monthly_quota
+        self.max_wait = max_wait
+        self.usage = usage or MonthlyUsage()
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self._month = current_month()
+        self._header_limit = None
+        self._header_remaining = None
+        self.admitted = 0
+        self.rejected = 0
+        self.upstream_429s = 0
+
+    def _monthly_remaining(self) -> Optional[int]:
+        if self._header_remaining is not None:
+            return self._header_remaining
+        if self.monthly_quota is not None:
+            return max(self.monthly_quota - self.usage.used(), 0)
+        return None
+
+    def acquire(self, max_wait: Optional[float] = None):
+        """Admit one upstream call or raise RateLimitExceeded"""
+        max_wait = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+
+        with self._lock:
+            if self._month != current_month():
+                self._month = current_month()
+                self._header_remaining = None
+
+            pause = self._paused_until - time.time()
+            if pause > max_wait:
+                self.rejected += 1
+                raise RateLimitExceeded(f"Upstream asked us to back off for {pause:.1f}s", retry_after=pause)
+
+            remaining = self._monthly_remaining()
+            if remaining is not None and remaining <= 0:
+                self.rejected += 1
+                raise RateLimitExceeded("Monthly upstream quota exhausted")
+
+        if pause > 0:
+            time.sleep(pause)
+            max_wait -= pause
+
+        try:
+            self.bucket.acquire(max_wait=max(max_wait, 0))
+        except RateLimitExceeded:
+            with self._lock:
+                self.rejected += 1
+            raise
+
+        self.usage.add()
+        with self._lock:
+            self.admitted += 1
+            if self._header_remaining is not None:
+                self._header_remaining -= 1
+
+    def update_from_response(self, status_code: int, headers: Mapping[str, str]):
+        """Honor Retry-After and rate-limit headers from an upstream response"""
+        with self._lock:
+            limit = headers.get('X-RateLimit-Requests-Limit')
+            remaining = headers.get('X-RateLimit-Requests-Remaining')
+            try:
+                if limit is not None:
+                    self._header_limit = int(limit)
+                if remaining is not None:
+                    self._header_remaining = int(remaining)
+            except ValueError:
+                pass
+
+            if status_code == 429:
+                self.upstream_429s += 1
+                try:
+                    retry_after = float(headers.get('Retry-After', 1))
+                except ValueError:
+                    retry_after = 1.0
+                self._paused_until = max(self._paused_until, time.time() + retry_after)
+
+    def get_stats(self) -> Dict:
+        """Remaining budget (tokens and monthly quota) and admit/reject counts"""
+        with self._lock:
+            return {
+                'ratePerSecond': self.bucket.rate,
+                'tokensAvailable': round(self.bucket.available(), 2),
+                'monthlyQuota': self._header_limit or self.monthly_quota,
+                'monthlyRemaining': self._monthly_remaining(),
+                'pausedFor': round(max(self._paused_until - time.time(), 0), 2),
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'upstream429s': self.upstream_429s
+            }
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+class SQLiteCache:
+    """Host-local cache shared by every gunicorn worker through one SQLite file
+
+    The database runs in WAL mode so readers in one worker never block a
+    writer in another. Values are stored as JSON under a namespace, which
+    lets listings and parsed LLM queries live in the same file. Any SQLite
+    error is logged and treated as a miss: the cache must never fail a
+    search.
+    """
+
+    def __init__(self, path: str, namespace: str, ttl: float = 900, max_entries: int = 5000):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sets_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection, reopened after a fork (gunicorn preload_app)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' namespace TEXT NOT NULL,'
+            ' key TEXT NOT NULL,'
+            ' value TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' PRIMARY KEY (namespace, key))'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_expiry ON cache (namespace, expires_at)')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _serialize_key(key: Hashable) -> str:
+        return json.dumps(key, separators=(',', ':'), default=str)
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the stored value, or ``default`` on a miss, expiry or error"""
+        try:
+            row = self._connection().execute(
+                'SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?',
+                (self.namespace, self._serialize_key(key))
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            self._count('errors')
+            return default
+
+        if row is None or row[1] <= time.time():
+            self._count('misses')
+            return default
+
+        self._count('hits')
+        return json.loads(row[0])
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a JSON-serializable value for every worker on this host"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)',
+                (self.namespace, self._serialize_key(key), json.dumps(value), expires_at)
+            )
+            self._maybe_prune(conn)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Shared cache write failed: {e}")
+            self._count('errors')
+
+    def _maybe_prune(self, conn: sqlite3.Connection):
+        """Drop expired rows and trim to max_entries every so often"""
+        with self._lock:
+            self._sets_since_prune += 1
+            if self._sets_since_prune < 50:
+                return
+            self._sets_since_prune = 0
+
+        conn.execute('DELETE FROM cache WHERE namespace = ? AND expires_at <= ?', (self.namespace, time.time()))
+        conn.execute(
+            'DELETE FROM cache WHERE namespace = ? AND key IN ('
+            ' SELECT key FROM cache WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+            (self.namespace, self.namespace, self.max_entries)
+        )
+
+    def clear(self):
+        """Remove every entry in this namespace"""
+        try:
+            self._connection().execute('DELETE FROM cache WHERE namespace = ?', (self.namespace,))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache clear failed: {e}")
+
+    def get_stats(self) -> Dict:
+        """Hit/miss/error counters for this worker"""
+        with self._lock:
+            return {
+                'path': self.path,
+                'namespace': self.namespace,
+                'hits': self.hits,
+                'misses': self.misses,
+                'errors': self.errors
+            }
+
+class TieredCache:
+    """In-process cache in front of a shared cache
+
+    Reads fall through to the shared tier on a local miss and warm the local
+    tier with what they find; writes go to both.
+    """
+
+    def __init__(self, local, shared):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+
+        value = self.shared.get(key)
+        if value is None:
+            return default
+
+        self.local.set(key, value)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self.local.set(key, value, ttl)
+        self.shared.set(key, value, ttl)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def get_stats(self) -> Dict:
+        stats = self.local.get_stats()
+        stats['shared'] = self.shared.get_stats()
+        return stats
@@ -0,0 +1,80 @@
+"""Request coalescing within one process
+
+Waiters share an in-memory entry, so coalescing only happens between
+threads of the same gunicorn worker; identical searches in different
+workers each go upstream, and the shared result cache only helps once the
+first of them has finished.
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class _Call:
+    """An in-flight call that followers wait on"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is still running wait for it and receive the same
+    result, or the same exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, func: Callable, *args, wait_timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run ``func`` once per key among concurrent callers and share the outcome
+
+        Followers give up with ``TimeoutError`` after ``wait_timeout`` seconds;
+        the leader's call is unaffected.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(wait_timeout):
+                raise TimeoutError(f"Timed out after {wait_timeout}s waiting for in-flight call")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def get_stats(self) -> Dict:
+        """Upstream executions, coalesced callers and calls currently in flight, for this worker only"""
+        with self._lock:
+            return {
+                'scope': 'worker',
+                'pid': os.getpid(),
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'inFlight': len(self._calls)
+            }
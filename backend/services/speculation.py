@@ -0,0 +1,65 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class SpeculativeRunner:
+    """Start work on a cheap guess while the authoritative answer is worked out
+
+    ``run`` submits ``work(guess)`` right away, then calls ``resolve()`` on
+    the caller's thread. If the resolved request has the same ``key`` as the
+    guess, the speculative result is used; otherwise the speculative work is
+    cancelled (or, if already running, left to finish on its own) and
+    ``work`` is called again with the resolved request.
+    """
+
+    def __init__(self, max_workers: int = 5):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='speculative')
+        self._lock = threading.Lock()
+        self.started = 0
+        self.confirmed = 0
+        self.discarded = 0
+        self.skipped = 0
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def run(self, guess: Optional[Any], resolve: Callable[[], Tuple[Any, Any]],
+            work: Callable[[Any], Any], key: Callable[[Any], Hashable]) -> Tuple[Any, Any, str]:
+        """Return ``(resolved payload, work result, outcome)``
+
+        ``resolve`` returns ``(request, payload)``; ``outcome`` is
+        'confirmed', 'discarded' or 'skipped' (no guess was given).
+        """
+        future = None
+        if guess is not None:
+            self._count('started')
+            future = self._executor.submit(work, guess)
+
+        request, payload = resolve()
+
+        if future is None:
+            self._count('skipped')
+            return payload, work(request), 'skipped'
+
+        if key(request) == key(guess):
+            self._count('confirmed')
+            return payload, future.result(), 'confirmed'
+
+        self._count('discarded')
+        future.cancel()
+        logger.info("Speculative guess did not match the resolved request, re-issuing")
+        return payload, work(request), 'discarded'
+
+    def get_stats(self) -> Dict:
+        """Guesses started, confirmed, discarded, and runs without a guess"""
+        with self._lock:
+            return {
+                'started': self.started,
+                'confirmed': self.confirmed,
+                'discarded': self.discarded,
+                'skipped': self.skipped
+            }
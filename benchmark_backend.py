@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for Enhanced Backend Components
+
+Upstream calls are simulated in-process so the numbers reflect our own
+overhead and concurrency, not RapidAPI's latency on the day.
+
+Usage: python benchmark_backend.py [benchmark_name ...]
+"""
+
+import sys
+import os
+import time
+import threading
+import re
+import json
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import app
+
+SIMULATED_LATENCY = 0.2  # seconds per simulated RapidAPI call
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response, streamed or not"""
+
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+        self.text = ''
+        self.headers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def json(self):
+        return self._payload
+
+    def iter_content(self, chunk_size=1):
+        body = json.dumps(self._payload).encode('utf-8')
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+def make_listing(listing_id, price=100):
+    """Build a RapidAPI-shaped listing"""
+    return {
+        'listing': {'id': str(listing_id), 'legacyName': f'Listing {listing_id}', 'title': 'Apartment'},
+        'structuredDisplayPrice': {'primaryLine': {'price': f'${price}'}},
+        'avgRatingLocalized': '4.8 (120)',
+        'contextualPictures': [{'picture': f'https://example.com/{listing_id}.jpg'}],
+        'demandStayListing': {'location': {'city': 'Somewhere'}},
+    }
+
+def fake_upstream(*args, **kwargs):
+    """Simulated RapidAPI call with fixed latency"""
+    time.sleep(SIMULATED_LATENCY)
+    listings = [make_listing(f'{threading.get_ident()}-{i}', 50 + i) for i in range(20)]
+    return FakeResponse({'data': {'list': listings}})
+
+class SerializingCircuitBreaker(app.CircuitBreaker):
+    """The previous breaker, which ran the wrapped call while holding its lock"""
+
+    def call(self, func, *args, **kwargs):
+        with self._lock:
+            return func(*args, **kwargs)
+
+def time_europe_search():
+    """Time a 5-city 'Europe' search end to end"""
+    locations = app.extract_multiple_locations_from_query('best places in europe')
+    app.search_cache.clear()
+    start = time.perf_counter()
+    properties = list(app.iter_unique_listings(app.iter_search_listings(locations)))
+    return time.perf_counter() - start, len(locations), len(properties)
+
+def benchmark_circuit_breaker():
+    """Compare fan-out latency with the serializing and non-blocking breakers"""
+    print('🔌 Circuit breaker fan-out (5-city Europe search):')
+    original_get = app.http_client.get
+    original_breaker = app.circuit_breaker
+    app.http_client.get = fake_upstream
+
+    try:
+        app.circuit_breaker = SerializingCircuitBreaker()
+        elapsed, cities, found = time_europe_search()
+        print(f'  serializing breaker:  {elapsed:.2f}s for {cities} cities ({found} properties)')
+
+        app.circuit_breaker = app.CircuitBreaker()
+        elapsed, cities, found = time_europe_search()
+        print(f'  non-blocking breaker: {elapsed:.2f}s for {cities} cities ({found} properties)')
+        print(f'  single city call:     ~{SIMULATED_LATENCY:.2f}s')
+    finally:
+        app.http_client.get = original_get
+        app.circuit_breaker = original_breaker
+
+def benchmark_search_cache():
+    """Compare cold and repeat searches that resolve to the same Place ID"""
+    print('🗄️ Search result cache (queries resolving to Paris):')
+    original_get = app.http_client.get
+    app.http_client.get = fake_upstream
+    app.search_cache.clear()
+
+    try:
+        for location in ['Paris', 'paris france', 'best places in paris']:
+            start = time.perf_counter()
+            properties = app.call_airbnb_search(location)
+            elapsed = time.perf_counter() - start
+            print(f'  {location!r:26} {elapsed * 1000:8.2f}ms ({len(properties)} properties)')
+        print(f'  cache stats: {app.search_cache.get_stats()}')
+    finally:
+        app.http_client.get = original_get
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+def benchmark_hedging():
+    """Compare single-city latency percentiles with and without hedging"""
+    import random
+    from services.hedging import HedgedCaller
+    print('🪃 Hedged requests (5% of calls hang for 0.5s, the rest take 10ms):')
+    rng = random.Random(42)
+    rng_lock = threading.Lock()
+
+    def flaky_upstream():
+        with rng_lock:
+            slow = rng.random() < 0.05
+        time.sleep(0.5 if slow else 0.01)
+        return 'ok'
+
+    for label, hedger in [('without hedging', None), ('with hedging', HedgedCaller(percentile=90, budget_ratio=0.1))]:
+        latencies = []
+        for _ in range(300):
+            start = time.perf_counter()
+            if hedger is None:
+                flaky_upstream()
+            else:
+                hedger.call(flaky_upstream)
+            latencies.append(time.perf_counter() - start)
+        print(f'  {label:16} p50 {percentile(latencies, 50) * 1000:6.1f}ms   p99 {percentile(latencies, 99) * 1000:6.1f}ms')
+        if hedger is not None:
+            print(f'  hedge stats: {hedger.get_stats()}')
+
+def linear_place_id(cities, location):
+    """The previous get_place_id lookup: exact, then substring scans over every city"""
+    location_lower = location.lower().strip()
+    if location_lower in cities:
+        return cities[location_lower]
+    for city, place_id in cities.items():
+        if city in location_lower:
+            return place_id
+    for city, place_id in cities.items():
+        if location_lower in city:
+            return place_id
+    return None
+
+def benchmark_location_index():
+    """Compare the old linear scan with the gazetteer over 10k synthetic cities"""
+    import logging
+    import random
+    from services.gazetteer import CITY_PLACE_IDS, Gazetteer
+    print('🗺️ Location resolution (10k cities, fuzzy matching on misses):')
+    logging.getLogger('services.gazetteer').setLevel(logging.WARNING)
+    rng = random.Random(7)
+    consonants, vowels = 'bcdfghjklmnprstvwz', 'aeiou'
+    cities = list(CITY_PLACE_IDS)
+    seen = {name.lower() for name, _ in cities}
+    while len(cities) < 10000:
+        words = [''.join(rng.choice(consonants) + rng.choice(vowels) for _ in range(rng.randint(2, 4)))
+                 for _ in range(rng.randint(1, 2))]
+        name = ' '.join(words).title()
+        if name.lower() not in seen:
+            seen.add(name.lower())
+            cities.append((name, f'place-{len(cities)}'))
+    linear = {}
+    for name, place_id in cities:
+        linear.setdefault(name.lower(), place_id)
+    index = Gazetteer(cities)
+
+    queries = {
+        'exact': [name for name, _ in cities[-200:]],
+        'embedded': [f'cheap stays in {name.lower()} next month' for name, _ in cities[-200:]],
+        'miss': [f'somewhere nobody has heard of {n}' for n in range(200)],
+        'typo': [name.lower()[:3] + name.lower()[4:] for name, _ in cities[-200:]],
+    }
+    for kind, locations in queries.items():
+        for label, lookup in [('linear scan', lambda loc: linear_place_id(linear, loc)), ('gazetteer', index.resolve)]:
+            start = time.perf_counter()
+            for location in locations:
+                lookup(location)
+            per_call = (time.perf_counter() - start) / len(locations)
+            print(f'  {kind:9} {label:12} {per_call * 1e6:10.1f}µs per lookup')
+
+def legacy_extract_location(query):
+    """The previous extract_location_from_query: 16 findall passes, skip words rebuilt per match"""
+    query_lower = query.lower().strip()
+    
+    # Enhanced location extraction patterns
+    location_patterns = [
+        # Direct location patterns
+        r'in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'near\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'around\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'at\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'to\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'from\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'visit\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'explore\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'stay\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'places?\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'accommodation\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'hotel\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'apartment\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'room\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        r'house\s+in\s+([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)',
+        # Location at end of query
+        r'([^,\.\?!]+(?:,\s*[^,\.\?!]+)*)$'
+    ]
+    
+    # Try each pattern
+    for pattern in location_patterns:
+        matches = re.findall(pattern, query_lower)
+        for match in matches:
+            location = match.strip()
+            
+            # Skip common non-location words
+            skip_words = {
+                'a', 'an', 'the', 'big', 'small', 'nice', 'good', 'great', 'beautiful', 
+                'cheap', 'expensive', 'luxury', 'budget', 'find', 'looking', 'search',
+                'apartment', 'house', 'room', 'place', 'hotel', 'accommodation',
+                'stay', 'night', 'week', 'month', 'vacation', 'holiday', 'trip',
+                'family', 'couple', 'group', 'people', 'person', 'guest', 'guests',
+                'bedroom', 'bathroom', 'kitchen', 'pool', 'wifi', 'parking'
+            }
+            
+            # Clean and validate location
+            location_words = [word.strip() for word in location.split() if word.strip()]
+            location_words = [word for word in location_words if word not in skip_words]
+            
+            if location_words and len(' '.join(location_words)) >= 2:
+                # Capitalize properly and return
+                cleaned_location = ' '.join(word.capitalize() for word in location_words)
+                
+                # Additional validation - must contain at least one letter
+                if re.search(r'[a-zA-Z]', cleaned_location):
+                    return cleaned_location
+    
+    # Final fallback - return a generic location
+    return 'United States'
+
+LOCATION_QUERIES = [
+    'Find a place in San Francisco',
+    'Looking for accommodation near London',
+    'Cheap apartment in Paris for a week',
+    'Luxury apartments in Tokyo',
+    'Best properties globally',
+    'Cheapest homes in Europe',
+    'I want to visit Barcelona next month',
+    'family trip to new york, 4 guests, with parking',
+    'stay in lisbon near the beach?',
+    'hotel in rome with a pool and wifi',
+    'romantic getaway around lake tahoe',
+    'places in amsterdam under $150 a night',
+    'house in austin tx for a bachelor party!',
+    'room in berlin',
+    'explore the coast of portugal',
+    'somewhere warm. maybe miami, or orlando',
+    'need a cabin at big bear for the weekend',
+    'flying from chicago to seattle, need a place',
+    'budget friendly stays',
+    'nice place with a kitchen',
+    'entire home, 3 bedrooms, close to downtown denver',
+    'pet friendly airbnb near the eiffel tower in paris france',
+    'Tokyo',
+    'sf',
+    'weekend in nashville for 6 people with a hot tub',
+]
+
+def benchmark_location_extraction():
+    """Compare per-query cost of the old and new location extraction"""
+    from services.query_parser import extract_location
+
+    def single_pass(query):
+        return extract_location(query.lower().strip())
+
+    print('📍 Location extraction (real-world queries, uncached):')
+    for query in LOCATION_QUERIES:
+        expected = legacy_extract_location(query)
+        actual = single_pass(query)
+        assert actual == expected, f'{query!r}: {actual!r} != {expected!r}'
+    print(f'  results identical on {len(LOCATION_QUERIES)} queries')
+
+    rounds = 200
+    for label, extract in [('16 findall passes', legacy_extract_location), ('single pass', single_pass)]:
+        per_query = []
+        for query in LOCATION_QUERIES:
+            start = time.perf_counter()
+            for _ in range(rounds):
+                extract(query)
+            per_query.append((time.perf_counter() - start) / rounds)
+        mean = sum(per_query) / len(per_query)
+        print(f'  {label:18} mean {mean * 1e6:6.1f}µs   slowest {max(per_query) * 1e6:6.1f}µs per query')
+
+def benchmark_query_analysis():
+    """Time the shared query analysis cold and from its cache"""
+    from services.query_parser import _analyze, analyze_query
+    print('🧩 Query analysis (locations, criteria and fallback parameters in one pass):')
+    rounds = 200
+    for label, clear in [('cold', True), ('cached', False)]:
+        _analyze.cache_clear()
+        for query in LOCATION_QUERIES:
+            analyze_query(query)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            if clear:
+                _analyze.cache_clear()
+            for query in LOCATION_QUERIES:
+                analyze_query(query)
+        per_query = (time.perf_counter() - start) / (rounds * len(LOCATION_QUERIES))
+        print(f'  {label:7} {per_query * 1e6:8.1f}µs per query')
+
+def benchmark_llm_query_cache():
+    """Compare a first LLM query parse with repeats of the same query"""
+    from services.openrouter_service import OpenRouterService
+    print('🧠 LLM query cache (LLM round trip simulated at 1s):')
+    service = OpenRouterService()
+
+    def slow_llm(messages, max_tokens=1000, **kwargs):
+        time.sleep(1.0)
+        return '{"location": "Paris", "bedrooms": 2}'
+
+    service._make_request = slow_llm
+    for query in ['Two-bedroom flat in Paris!', '2 bedroom flat in paris', 'TWO bedroom flat, in Paris']:
+        start = time.perf_counter()
+        service.process_search_query(query)
+        elapsed = time.perf_counter() - start
+        print(f'  {query!r:30} {elapsed * 1e6:12.1f}µs')
+    print(f'  cache stats: {service.get_cache_stats()}')
+
+def benchmark_property_filter():
+    """Time the filter pass and compare response sizes with and without filters"""
+    import json
+    from services.property_filter import PropertyFilter
+    print('🧹 Server-side filters (2,000 transformed properties, prices $50-$549):')
+    properties = app.transform_airbnb_properties([make_listing(i, 50 + i % 500) for i in range(2000)])
+    unfiltered_bytes = len(json.dumps(app.serialize_properties(properties)))
+    for filters in [{'priceMax': 500}, {'priceMin': 100, 'priceMax': 200}, {'priceMax': 60}]:
+        property_filter = PropertyFilter(filters)
+        start = time.perf_counter()
+        kept = property_filter.apply(properties)
+        elapsed = time.perf_counter() - start
+        ratio = len(json.dumps(app.serialize_properties(kept))) / unfiltered_bytes
+        print(f'  {str(filters):36} {len(kept):5} kept in {elapsed * 1e3:6.2f}ms, response {ratio:6.1%} of unfiltered')
+
+def benchmark_top_k():
+    """Compare a full sorted response with a heap-selected first page of a PropertyBatch"""
+    import json
+    import random
+    print('🔝 Price-sorted 10-location search (500 properties), select and serialize:')
+    raw = [make_listing(i, random.randint(30, 900)) for i in range(500)]
+    properties = app.transform_airbnb_properties(raw)
+    batch = app.PropertyBatch.from_properties(properties)
+    criteria = {'sort_by': 'price_asc'}
+    rounds = 500
+    for label, select in [
+        ('full sort', lambda: app.serialize_properties(app.sort_properties(list(properties), criteria))),
+        ('top-k (10)', lambda: app.select_properties(batch, criteria, 0, 10)),
+    ]:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            payload = json.dumps(select())
+        elapsed = (time.perf_counter() - start) / rounds
+        print(f'  {label:12} {elapsed * 1e6:8.1f}µs per response, {len(payload):7} bytes')
+
+def measure_held_memory(label, build, raw):
+    """Print the memory still held by ``build(raw)`` once it returns"""
+    import tracemalloc
+    tracemalloc.start()
+    result_set = build(raw)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'  {label:16} {held / 1024:8.0f} KiB ({held / len(result_set):5.0f} bytes per property)')
+
+def transform_to_dicts(raw):
+    """Transformed listings as plain dicts, as every listing was held before Property records"""
+    return app.serialize_properties(app.transform_airbnb_properties(raw))
+
+def transform_to_batch(raw):
+    """Transformed listings collected into a PropertyBatch, as /api/v1/search holds them"""
+    return app.PropertyBatch.from_properties(app.iter_transformed_properties(raw))
+
+def benchmark_property_records():
+    """Compare bytes per listing for a 1,000-listing result as dicts and as Property records"""
+    import random
+    print('🪶 1,000-listing result held in memory:')
+    raw = [make_listing(i, random.randint(30, 900)) for i in range(1000)]
+    measure_held_memory('dicts', transform_to_dicts, raw)
+    measure_held_memory('Property records', app.transform_airbnb_properties, raw)
+
+def benchmark_property_batch():
+    """Compare memory held by a merged result set as records and as a PropertyBatch"""
+    import random
+    print('🧱 Merged result set of 5,000 properties held in memory:')
+    raw = [make_listing(i, random.randint(30, 900)) for i in range(5000)]
+    measure_held_memory('dicts', transform_to_dicts, raw)
+    measure_held_memory('Property records', app.transform_airbnb_properties, raw)
+    measure_held_memory('PropertyBatch', transform_to_batch, raw)
+
+def benchmark_json_responses():
+    """Time encoding 50/500/5,000-listing search responses with each JSON provider"""
+    from flask.json.provider import DefaultJSONProvider
+    from services.json_provider import FastJSONProvider, orjson
+    print('📦 Search response encoding (Flask default vs FastJSONProvider):')
+    providers = [
+        ('flask default', DefaultJSONProvider(app.app)),
+        ('fast (stdlib)', FastJSONProvider(app.app, use_orjson=False)),
+    ]
+    if orjson is not None:
+        providers.append(('fast (orjson)', FastJSONProvider(app.app)))
+    else:
+        print('  orjson is not installed; only the stdlib path is measured')
+    for _, provider in providers:
+        provider.compact = True  # As in production, even if FLASK_DEBUG is set locally
+
+    for count in (50, 500, 5000):
+        properties = app.serialize_properties(app.transform_airbnb_properties([make_listing(i) for i in range(count)]))
+        body = {'success': True, 'data': {'properties': properties, 'total': count}}
+        rounds = max(5, 5000 // count)
+        for label, provider in providers:
+            with app.app.app_context():
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    response = provider.response(body)
+                elapsed = (time.perf_counter() - start) / rounds
+            print(f'  {count:5} listings, {label:14} {elapsed * 1e3:8.2f}ms ({len(response.get_data()):8} bytes)')
+
+def make_full_listing(listing_id, price=100):
+    """A listing padded with the kinds of fields RapidAPI sends and we never read"""
+    listing = make_listing(listing_id, price)
+    listing['listing'].update({
+        'avgRating': 4.8, 'coordinate': {'latitude': 48.85, 'longitude': 2.35},
+        'structuredContent': {'primaryLine': [{'body': '2 beds', 'type': 'BEDINFO'}] * 3},
+        'contextualPictures': [{'picture': f'https://example.com/{listing_id}/{i}.jpg', 'caption': None} for i in range(10)],
+    })
+    listing.update({
+        'contextualPictures': [{'id': str(i), 'picture': f'https://example.com/{listing_id}/{i}.jpg',
+                                'caption': {'messages': ['Living room'] * 2}} for i in range(10)],
+        'badges': [{'text': 'Guest favorite', 'loggingContext': {'badgeType': 'GUEST_FAVORITE'}}],
+        'pricingQuote': {'structuredStayDisplayPrice': {'explanationData': {'priceDetails': [
+            {'items': [{'description': f'{n} nights x ${price}', 'priceString': f'${price * n}'}]} for n in range(1, 8)
+        ]}}},
+        'listingParamOverrides': {'categoryTag': 'Tag:8678', 'photoId': '1234567890'},
+    })
+    return listing
+
+def benchmark_stream_extraction():
+    """Compare peak memory and time of parsing a RapidAPI page whole and as a stream"""
+    import tracemalloc
+    from services.json_stream import extract_json_array
+    print('🌊 RapidAPI listing extraction (one 50-listing page, 16 KiB chunks):')
+    payload = {'status': True, 'message': 'Success',
+               'data': {'list': [make_full_listing(i) for i in range(50)], 'paginationInfo': {'pageCursors': ['x'] * 20}}}
+    response = FakeResponse(payload)
+    chunks = list(response.iter_content(app.RAPIDAPI_STREAM_CHUNK_SIZE))
+    body = b''.join(chunks)
+    print(f'  response body {len(body) / 1024:.0f} KiB')
+
+    for label, parse in [
+        ('whole (json)', lambda: json.loads(b''.join(chunks))['data']['list']),
+        ('streamed + pruned', lambda: list(extract_json_array(iter(chunks), ('data', 'list'), app.LISTING_FIELDS))),
+    ]:
+        tracemalloc.start()
+        listings = parse()
+        held, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        start = time.perf_counter()
+        for _ in range(20):
+            parse()
+        elapsed = (time.perf_counter() - start) / 20
+        print(f'  {label:18} peak {peak / 1024:6.0f} KiB, kept {held / 1024:6.0f} KiB, '
+              f'{elapsed * 1e3:6.2f}ms ({len(listings)} listings)')
+
+PIPELINE_CITIES = ['Paris', 'London', 'Rome', 'Barcelona', 'Amsterdam',
+                   'Berlin', 'Lisbon', 'Vienna', 'Prague', 'Madrid']
+
+def materialized_search(locations, filters, criteria, limit):
+    """The previous search path: every stage builds a full list before the next starts"""
+    properties = app.PropertyFilter(filters).apply(
+        app.transform_airbnb_properties(list(app.iter_unique_listings(app.iter_search_listings(locations, filters))))
+    )
+    return app.sort_properties(properties, criteria)[:limit]
+
+def pipelined_search(locations, filters, criteria, limit, stats):
+    """Listings stream from fetch into a top-k sink"""
+    fetched = app.iter_search_listings(locations, filters)
+    return app.run_property_pipeline(fetched, app.PropertyFilter(filters), app.ranking_sink(criteria, limit), stats).results()
+
+def benchmark_search_pipeline():
+    """Compare peak memory and time of the materialized and pipelined search paths"""
+    import random
+    import tracemalloc
+    from services.pipeline import PipelineStats
+    print('🚰 10-city search, 1,000 listings per city, top 20 by price:')
+    pages = {city: [make_listing(f'{city}-{i}', random.randint(30, 900)) for i in range(1000)]
+             for city in PIPELINE_CITIES}
+    original_search = app.call_airbnb_search
+    app.call_airbnb_search = lambda location, deadline=None, **kwargs: [dict(prop) for prop in pages[location]]
+    filters = {'priceMax': 600}
+    criteria = {'sort_by': 'price_asc'}
+
+    try:
+        runs = [
+            ('materialized', lambda stats: materialized_search(PIPELINE_CITIES, filters, criteria, 20)),
+            ('pipelined', lambda stats: pipelined_search(PIPELINE_CITIES, filters, criteria, 20, stats)),
+        ]
+        for label, run in runs:
+            tracemalloc.start()
+            results = run(PipelineStats())
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            stats = PipelineStats()
+            start = time.perf_counter()
+            run(stats)
+            elapsed = time.perf_counter() - start
+            print(f'  {label:13} peak {peak / 1024:6.0f} KiB, {elapsed * 1e3:7.2f}ms ({len(results)} results)')
+        for name, stage in stats.summary().items():
+            print(f"    {name:10} {stage['items']:6} items {stage['ms']:8.2f}ms")
+    finally:
+        app.call_airbnb_search = original_search
+
+BENCHMARKS = {
+    'circuit_breaker': benchmark_circuit_breaker,
+    'search_cache': benchmark_search_cache,
+    'hedging': benchmark_hedging,
+    'location_index': benchmark_location_index,
+    'location_extraction': benchmark_location_extraction,
+    'query_analysis': benchmark_query_analysis,
+    'llm_query_cache': benchmark_llm_query_cache,
+    'property_filter': benchmark_property_filter,
+    'top_k': benchmark_top_k,
+    'property_records': benchmark_property_records,
+    'property_batch': benchmark_property_batch,
+    'json_responses': benchmark_json_responses,
+    'stream_extraction': benchmark_stream_extraction,
+    'search_pipeline': benchmark_search_pipeline,
+}
+
+def main():
+    """Run the selected benchmarks (all by default)"""
+    print("⏱️ Enhanced AI Airbnb Search Backend - Benchmarks")
+    print("=" * 60)
+
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        BENCHMARKS[name]()
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,58 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 
 from app import *
 import json
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+def raw_listing(listing_id, price=100, title=None, name=None, **fields):
+    """A RapidAPI-shaped listing with the fields the transform reads"""
+    listing = {'id': str(listing_id), 'legacyName': name or str(listing_id)}
+    if title is not None:
+        listing['title'] = title
+    raw = {'listing': listing, 'structuredDisplayPrice': {'primaryLine': {'price': f'${price}'}}}
+    raw.update(fields)
+    return raw
+
+@contextmanager
+def patched_search(listings_for):
+    """Replace call_airbnb_search with ``listings_for(location)``
+
+    Yields the ``(location, kwargs)`` of every call; the real search is
+    restored on exit.
+    """
+    app_module = sys.modules['app']
+    original_search = app_module.call_airbnb_search
+    calls = []
+
+    def fake_search(location, deadline=None, **kwargs):
+        calls.append((location, kwargs))
+        return listings_for(location)
+
+    app_module.call_airbnb_search = fake_search
+    try:
+        yield calls
+    finally:
+        app_module.call_airbnb_search = original_search
+
+class StreamedResponse:
+    """A streamed RapidAPI response whose body arrives in 7-byte chunks"""
+    headers = {}
+
+    def __init__(self, body, status_code=200):
+        self.body = body
+        self.status_code = status_code
+        self.text = body.decode()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.body), 7):  # Split keys and strings across chunks
+            yield self.body[start:start + 7]
 
 def test_input_validation():
     """Test enhanced input validation"""
@@ -42,7 +94,756 @@ def test_circuit_breaker():
     cb = CircuitBreaker(failure_threshold=2, recovery_timeout=1)
     print(f'✅ Initial state: {cb.state}')
     print(f'✅ Failure count: {cb.failure_count}')
-    
+
+    def failing_call():
+        raise ValueError("upstream down")
+
+    for _ in range(2):
+        try:
+            cb.call(failing_call)
+        except ValueError:
+            pass
+    assert cb.state == 'OPEN'
+    print(f'✅ State after {cb.failure_count} failures: {cb.state}')
+
+    # After the recovery timeout only the probe quota is let through
+    cb.last_failure_time = time.time() - 2
+    cb._before_call()
+    assert cb.state == 'HALF_OPEN'
+    try:
+        cb.call(lambda: 'second probe')
+        assert False, "probe quota should be exhausted"
+    except CircuitBreakerOpenError:
+        print('✅ Extra HALF_OPEN call rejected')
+    cb.record_success()
+    assert cb.state == 'CLOSED'
+    print(f'✅ State after successful probe: {cb.state}')
+
+    return True
+
+def test_http_connection_pool():
+    """Test keep-alive connection reuse in the pooled HTTP client"""
+    print('\n🔗 Testing HTTP Connection Pool:')
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from services.http_client import PooledHTTPClient
+
+    class KeepAliveHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client = PooledHTTPClient(pool_maxsize=2)
+    try:
+        for _ in range(3):
+            response = client.get(f'http://127.0.0.1:{server.server_port}/')
+            assert response.json() == {'ok': True}
+
+        host_stats = client.get_stats()['hosts']['127.0.0.1']
+        assert host_stats['new_connections'] == 1
+        assert host_stats['hits'] == 2
+        print(f'✅ Pool stats after 3 requests: {host_stats}')
+    finally:
+        client.session.close()
+        server.shutdown()
+        server.server_close()
+
+    return True
+
+def test_search_result_cache():
+    """Test TTL expiry and LRU eviction in the search result cache"""
+    print('\n🗄️ Testing Search Result Cache:')
+    from services.result_cache import TTLCache
+
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set('paris', [1])
+    cache.set('london', [2])
+    cache.get('paris')
+    cache.set('tokyo', [3])
+    assert cache.get('london') is None, "least recently used entry should be evicted"
+    assert cache.get('paris') == [1]
+    print(f'✅ LRU eviction: {cache.get_stats()}')
+
+    cache.set('rome', [4], ttl=0)
+    assert cache.get('rome') is None
+    assert cache.expirations == 1
+    print('✅ Expired entry dropped')
+
+    params = {'placeId': 'ChIJD7fiBh9u5kcRYJSMaMOCCwQ', 'adults': 1, 'currency': 'USD'}
+    assert build_search_cache_key(params) == build_search_cache_key(dict(params))
+    print(f'✅ Cache key: {build_search_cache_key(params)}')
+
+    return True
+
+def test_shared_cache():
+    """Test that the SQLite cache is shared between independent instances"""
+    print('\n💾 Testing Shared Cache:')
+    import tempfile
+    from services.result_cache import TTLCache
+    from services.shared_cache import SQLiteCache, TieredCache
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'cache.sqlite3')
+        worker_a = TieredCache(TTLCache(), SQLiteCache(path, 'listings'))
+        worker_b = TieredCache(TTLCache(), SQLiteCache(path, 'listings'))
+
+        key = ('ChIJD7fiBh9u5kcRYJSMaMOCCwQ', 1, None)
+        worker_a.set(key, [{'listing': {'id': '1'}}])
+        assert worker_b.get(key) == [{'listing': {'id': '1'}}]
+        print(f'✅ Worker B read worker A entry: {worker_b.get_stats()["shared"]}')
+
+        worker_a.shared.set('expired', [1], ttl=-1)
+        assert worker_b.shared.get('expired') is None
+        assert SQLiteCache(path, 'llm_query').get(key) is None
+        print('✅ Expired and other-namespace entries are misses')
+
+    return True
+
+def test_llm_query_cache():
+    """Test that parsed LLM results are cached by normalized query"""
+    print('\n🧠 Testing LLM Query Cache:')
+    import tempfile
+    from services.openrouter_service import OpenRouterService
+    from services.shared_cache import SQLiteCache
+
+    llm_calls = []
+
+    def fake_llm(messages, max_tokens=1000, **kwargs):
+        llm_calls.append(messages[-1]['content'])
+        return '{"location": "Paris", "bedrooms": 2}'
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'cache.sqlite3')
+        service = OpenRouterService(query_cache=SQLiteCache(path, 'llm_query'))
+        service._make_request = fake_llm
+
+        first = service.process_search_query('Two-bedroom flat in Paris!')
+        repeat = service.process_search_query('  2 bedroom flat in PARIS ')
+        assert first == repeat == {'location': 'Paris', 'bedrooms': 2, 'adults': 2, 'children': 0, 'infants': 0, 'pets': 0}
+        assert len(llm_calls) == 1
+        stats = service.get_cache_stats()
+        assert stats['hits'] == 1 and stats['llmCalls'] == 1
+        assert stats['entries'] == 1 and stats['bytes'] == len(json.dumps(first))
+        print(f'✅ Case, punctuation and number-word variants share one LLM call: {stats}')
+
+        # A restarted worker finds the entry on disk
+        restarted = OpenRouterService(query_cache=SQLiteCache(path, 'llm_query'))
+        restarted._make_request = fake_llm
+        assert restarted.process_search_query('two bedroom flat in paris') == first
+        assert len(llm_calls) == 1
+        print('✅ Persisted entries survive a restart')
+
+    return True
+
+def test_request_coalescing():
+    """Test that concurrent identical calls share one execution"""
+    print('\n🤝 Testing Request Coalescing:')
+    from services.single_flight import SingleFlight
+
+    flight = SingleFlight()
+    barrier = threading.Barrier(5)
+
+    def slow_search():
+        time.sleep(0.2)
+        return ['listing']
+
+    def caller():
+        barrier.wait()
+        return flight.do('paris', slow_search)
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        results = list(executor.map(lambda _: caller(), range(5)))
+
+    assert results == [['listing']] * 5
+    assert flight.executions == 1 and flight.coalesced == 4
+    assert flight.get_stats()['scope'] == 'worker' and flight.get_stats()['pid'] == os.getpid()
+    print(f'✅ 5 callers coalesced: {flight.get_stats()}')
+
+    return True
+
+def test_async_fanout():
+    """Test per-host concurrency limits and per-item timeouts in the fan-out engine"""
+    print('\n🌍 Testing Async Fan-out:')
+    from services.fanout import AsyncFanout
+
+    fanout = AsyncFanout(max_workers=8, per_host_limit=2)
+    active = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def fetch(city):
+        with lock:
+            active.append(city)
+            peak[0] = max(peak[0], len(active))
+        time.sleep(0.5 if city == 'slow' else 0.05)
+        with lock:
+            active.remove(city)
+        return city.upper()
+
+    cities = ['paris', 'rome', 'oslo', 'lima', 'slow']
+    results = list(fanout.iter_completed(fetch, cities, host='rapidapi', timeout=0.3))
+    succeeded = {city: result for city, result, error in results if error is None}
+    failed = [city for city, result, error in results if error is not None]
+
+    assert succeeded == {'paris': 'PARIS', 'rome': 'ROME', 'oslo': 'OSLO', 'lima': 'LIMA'}
+    assert failed == ['slow']
+    assert peak[0] <= 2
+    print(f'✅ {len(succeeded)} completed, timed out: {failed}, peak concurrency: {peak[0]}')
+
+    return True
+
+def test_streaming_search():
+    """Test that the streaming endpoint emits one frame per location plus a summary"""
+    print('\n📡 Testing Streaming Search:')
+    with patched_search(lambda location: [raw_listing(f'{location}-1', len(location) * 10, name=location)]):
+        response = app.test_client().post('/api/v1/search/stream', json={'query': 'cheapest homes in europe'})
+        frames = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert [frame['type'] for frame in frames] == ['meta'] + ['location'] * 5 + ['summary']
+    summary = frames[-1]
+    assert summary['total'] == 5
+    assert summary['ordering'][0] == 'rome-1'
+    print(f'✅ {len(frames)} frames, final ordering: {summary["ordering"]}')
+
+    return True
+
+def test_speculative_ai_search():
+    """Test that /ai-search searches the heuristic location while the LLM parses"""
+    print('\n🏎️ Testing Speculative AI Search:')
+    app_module = sys.modules['app']
+    original_parse = app_module.openrouter_service.process_search_query
+
+    def slow_search(location):
+        time.sleep(0.2)
+        return [raw_listing(f'{location}-1', name=location)]
+
+    def slow_llm(location):
+        def parse(query, timeout=None):
+            time.sleep(0.2)
+            return {'location': location, 'adults': 2, 'children': 0, 'infants': 0, 'pets': 0}
+        return parse
+
+    try:
+        with patched_search(slow_search) as calls:
+            # The LLM agrees: the speculative search is used and both ran in parallel
+            app_module.openrouter_service.process_search_query = slow_llm('Paris')
+            start = time.time()
+            response = app.test_client().post('/ai-search', json={'query': 'apartment in paris', 'search': True})
+            elapsed = time.time() - start
+            data = response.get_json()['data']
+            assert data['speculation'] == 'confirmed'
+            assert data['total'] == 1 and [location for location, _ in calls] == ['Paris']
+            assert elapsed < 0.35
+            print(f'✅ Confirmed speculation finished in {elapsed:.2f}s')
+
+            # The LLM disagrees: its location is searched instead
+            calls.clear()
+            app_module.openrouter_service.process_search_query = slow_llm('London')
+            data = app.test_client().post('/ai-search', json={'query': 'apartment in paris', 'search': True}).get_json()['data']
+            assert data['speculation'] == 'discarded'
+            assert data['properties'][0]['id'] == 'London-1'
+            assert [location for location, _ in calls] == ['Paris', 'London']
+            print(f'✅ Discarded speculation re-issued for the LLM location: {app_module.speculative_runner.get_stats()}')
+
+            # A place get_place_id would reject is neither speculated on nor used as the fallback
+            calls.clear()
+            app_module.openrouter_service.process_search_query = slow_llm('Lisbon')
+            data = app.test_client().post('/ai-search', json={'query': 'places in porto', 'search': True}).get_json()['data']
+            assert data['speculation'] == 'skipped'
+            assert [location for location, _ in calls] == ['Lisbon']
+            assert analyze_query('places in porto').fallback_location is None
+            print('✅ No speculative search for a location without a confident Place ID')
+    finally:
+        app_module.openrouter_service.process_search_query = original_parse
+
+    return True
+
+def test_combined_ai_search():
+    """Test that /api/v1/ai-search sends the parsed guests, dates and prices upstream"""
+    print('\n🧭 Testing Combined AI Search Endpoint:')
+    app_module = sys.modules['app']
+    original_parse = app_module.openrouter_service.process_search_query
+    app_module.openrouter_service.process_search_query = lambda query, timeout=None: {
+        'location': 'Lisbon', 'adults': 3, 'children': 1, 'infants': 0, 'pets': 1,
+        'checkin': '2026-12-20', 'checkout': '2026-12-27', 'price_min': 50, 'price_max': 'cheap'
+    }
+    try:
+        with patched_search(lambda location: [raw_listing(f'{location}-1', 150, name=location)]) as calls:
+            response = app.test_client().post('/api/v1/ai-search', json={'query': 'family trip to lisbon with our dog'})
+            data = response.get_json()['data']
+            assert response.status_code == 200
+            assert data['total'] == 1 and data['source'] == 'ai_rapidapi_search'
+            location, kwargs = calls[-1]
+            assert location == 'Lisbon'
+            assert kwargs['adults'] == 3 and kwargs['children'] == 1 and kwargs['pets'] == 1
+            assert kwargs['checkin'] == '2026-12-20' and kwargs['checkout'] == '2026-12-27'
+            assert kwargs['min_price'] == 50 and 'max_price' not in kwargs
+            print(f'✅ Parsed parameters reached RapidAPI: {kwargs}')
+
+            # Client price filters override the parsed range; invalid dates are dropped
+            app_module.openrouter_service.process_search_query = lambda query, timeout=None: {
+                'location': 'Lisbon', 'adults': 0, 'checkin': 'next friday', 'checkout': '2026-12-27'
+            }
+            app.test_client().post('/api/v1/ai-search', json={'query': 'lisbon', 'filters': {'priceMax': 300}})
+            _, kwargs = calls[-1]
+            assert kwargs.get('max_price') == 300
+            assert 'adults' not in kwargs and 'checkin' not in kwargs
+            print('✅ Filters override parsed prices and invalid parameters are dropped')
+
+            response = app.test_client().post('/api/v1/ai-search', json={'query': ''})
+            assert response.status_code == 400
+
+            # The LLM parse only gets the budget left after the search is reserved
+            app_module.openrouter_service.process_search_query = original_parse
+            read_timeouts = []
+
+            def fake_llm(messages, max_tokens=1000, read_timeout=30):
+                read_timeouts.append(read_timeout)
+                return '{"location": "Berlin", "adults": 2}'
+
+            app_module.openrouter_service._make_request = fake_llm
+            app.test_client().post('/api/v1/ai-search', json={'query': 'quiet loft in berlin'})
+            assert read_timeouts and read_timeouts[0] <= SEARCH_REQUEST_BUDGET - AI_SEARCH_RESERVE
+            assert calls[-1][0] == 'Berlin'
+            print(f'✅ LLM read timeout bounded by the request budget: {read_timeouts[0]:.2f}s')
+
+            app_module.AI_SEARCH_RESERVE = SEARCH_REQUEST_BUDGET
+            data = app.test_client().post('/api/v1/ai-search', json={'query': 'sunny flat in madrid'}).get_json()['data']
+            assert len(read_timeouts) == 1 and calls[-1][0] == 'Madrid'
+            assert data['searchParams']['location'] == 'Madrid'
+            print('✅ Heuristic parse used when the budget cannot fit an LLM call')
+    finally:
+        app_module.openrouter_service.process_search_query = original_parse
+        app_module.AI_SEARCH_RESERVE = AI_SEARCH_RESERVE
+        app_module.openrouter_service.__dict__.pop('_make_request', None)
+
+    return True
+
+def test_server_side_filters():
+    """Test that validated filters reach RapidAPI and trim the results"""
+    print('\n🧹 Testing Server-Side Filters:')
+    listings = [
+        raw_listing('villa-1', 120, 'Villa in Paris'),
+        raw_listing('villa-2', 400, 'Villa in Paris'),
+        raw_listing('flat-1', 90, 'Rental unit in Paris'),
+        raw_listing('room-1', 60, 'Room in Paris'),
+        raw_listing('home-1', 200, 'Home in Paris'),
+        raw_listing('room-2', 80, 'Private room in home')
+    ]
+    with patched_search(lambda location: [dict(prop) for prop in listings]) as calls:
+        response = app.test_client().post('/api/v1/search', json={
+            'query': 'places in paris',
+            'filters': {'priceMin': 50.5, 'priceMax': 150, 'propertyTypes': ['villa', 'apartment']}
+        })
+        data = response.get_json()['data']
+        assert calls[-1][1] == {'min_price': 50, 'max_price': 150}
+        assert sorted(prop['id'] for prop in data['properties']) == ['flat-1', 'villa-1']
+        print(f"✅ Price range pushed upstream, {data['total']} of {len(listings)} properties kept")
+
+        # The option ids FilterPanel.tsx sends
+        for amenities in (['wifi'], ['tv'], ['washer'], ['wifi', 'tv', 'washer']):
+            data = app.test_client().post('/api/v1/search', json={
+                'query': 'places in paris', 'filters': {'amenities': amenities}
+            }).get_json()['data']
+            assert calls[-1][1] == {} and data['total'] == len(listings), amenities
+            assert data['skippedFilters'] == ['amenities']
+        print('✅ Listings without extracted amenities are not dropped, and the skip is reported')
+
+        data = app.test_client().post('/api/v1/search', json={
+            'query': 'places in paris', 'filters': {'propertyTypes': ['entire_house']}
+        }).get_json()['data']
+        assert sorted(prop['id'] for prop in data['properties']) == ['home-1', 'villa-1', 'villa-2']
+        assert data['skippedFilters'] == []
+        print('✅ entire_house matches homes and villas, not rooms (even rooms in a home) or rental units')
+
+        property_filter = PropertyFilter({'amenities': ['wifi', 'washer']})
+        record = transform_airbnb_properties(listings[:1])[0]
+        assert property_filter.matches(dataclasses.replace(record, amenities=('WiFi', 'Washer', 'TV')))
+        assert not property_filter.matches(dataclasses.replace(record, amenities=('WiFi', 'TV')))
+        assert property_filter.skipped_filters() == []
+        assert property_filter.matches(record) and property_filter.skipped_filters() == ['amenities']
+        print('✅ Extracted amenities must include every selected amenity')
+
+    return True
+
+def test_paginated_search():
+    """Test that paged searches return top-k pages from the cached result set"""
+    print('\n📄 Testing Paginated Search:')
+    app_module = sys.modules['app']
+    app_module.result_set_cache.clear()
+    try:
+        with patched_search(lambda location: [raw_listing(f'{location}-{i}', (i * 37) % 23 + 50) for i in range(25)]) as calls:
+            client = app.test_client()
+            query = {'query': 'cheapest places in paris'}
+            full = client.post('/api/v1/search', json=query).get_json()['data']
+            assert full['nextCursor'] is None and full['total'] == 25
+
+            pages = []
+            cursor = None
+            while True:
+                page = client.post('/api/v1/search', json=dict(query, limit=10, cursor=cursor)).get_json()['data']
+                assert page['total'] == 25 and len(page['properties']) <= 10
+                pages.extend(prop['id'] for prop in page['properties'])
+                cursor = page['nextCursor']
+                if cursor is None:
+                    break
+            assert pages == [prop['id'] for prop in full['properties']]
+            assert [location for location, _ in calls] == ['Paris', 'Paris']  # One search for the full list, one for the first page
+            print('✅ 3 pages match the fully sorted list, later pages served from memory')
+
+            response = client.post('/api/v1/search', json=dict(query, limit=10, cursor='bogus:10'))
+            assert response.status_code == 400
+            print('✅ Cursors from another search are rejected')
+    finally:
+        app_module.result_set_cache.clear()
+
+    return True
+
+def test_location_collapsing_and_dedup():
+    """Test that locations sharing a Place ID are searched once and listings are deduplicated"""
+    print('\n🧬 Testing Place ID Collapsing and Listing Dedup:')
+    # Every city returns one shared listing plus its own
+    with patched_search(lambda location: [raw_listing('shared-1'), raw_listing(f'{location}-1')]) as calls:
+        properties = list(iter_unique_listings(iter_search_listings(['Las Vegas', 'San Diego', 'Paris', 'Xyzzy Plugh'])))
+        searched = [location for location, _ in calls]
+        assert sorted(searched) == ['Las Vegas', 'Paris']
+        ids = [prop['listing']['id'] for prop in properties]
+        assert sorted(ids) == ['Las Vegas-1', 'Paris-1', 'shared-1']
+        shared = next(prop for prop in properties if prop['listing']['id'] == 'shared-1')
+        assert shared['search_location'] in ('Las Vegas', 'Paris')
+        print(f'✅ Searched {searched} for 4 locations, {len(properties)} unique listings')
+
+        assert list(iter_search_listings(['Xyzzy Plugh', 'Narnia Nowhere'])) == []
+        print('✅ Locations without a Place ID are not searched')
+
+    return True
+
+def test_property_batch():
+    """Test that the columnar PropertyBatch matches the dict pipeline"""
+    print('\n🧱 Testing Columnar Property Batch:')
+    from services.property_batch import PropertyBatch
+    from services.property_filter import PropertyFilter
+    raw = [raw_listing(f'p{i}', (i * 37) % 23 + 50, 'Villa in Rome' if i % 3 else 'Room in Rome', f'Listing {i}',
+                       avgRatingLocalized=f'4.{i % 10} ({i})')
+           for i in range(60)]
+    properties = transform_airbnb_properties(raw)
+    batch = PropertyBatch.from_properties(iter_transformed_properties(raw))
+    assert len(batch) == 60 and batch.to_dicts() == serialize_properties(properties)
+
+    for sort_by in ('price_asc', 'price_desc', None):
+        expected = serialize_properties(sort_properties(list(properties), {'sort_by': sort_by}))
+        assert select_properties(batch, {'sort_by': sort_by}) == expected
+        assert select_properties(batch, {'sort_by': sort_by}, 20, 10) == expected[20:30]
+    print('✅ Full sorts and top-k pages match sort_properties')
+
+    for filters in ({'priceMax': 60}, {'priceMin': 55, 'propertyTypes': ['villa']}, {'amenities': ['wifi', 'kitchen']}):
+        property_filter = PropertyFilter(filters)
+        assert property_filter.apply_batch(batch).to_dicts() == serialize_properties(property_filter.apply(properties))
+    print('✅ Column filters match the per-property filters')
+
+    # Repeated strings and amenity lists are stored once
+    columns = PropertyBatch.from_properties(properties).columns
+    assert columns['type'][1] is columns['type'][2]
+    assert columns['amenities'][0] is columns['amenities'][59]
+    return True
+
+def test_property_records():
+    """Test that transformed listings are slotted records serialized to the API's JSON shape"""
+    print('\n🪶 Testing Property Records:')
+    first, second = transform_airbnb_properties([
+        raw_listing('1', 120, 'Loft in Paris', 'Loft', avgRatingLocalized='4.9 (80)'),
+        {'listing': {'id': '2', 'legacyName': 'Flat', 'title': 'Loft in Paris'}}
+    ])
+    assert not hasattr(first, '__dict__')
+    assert first.amenities is second.amenities and first.type is second.type
+
+    data = first.to_dict()
+    assert list(data) == ['id', 'title', 'price', 'currency', 'rating', 'reviewCount', 'imageUrl', 'location',
+                          'url', 'type', 'guests', 'source', 'bedrooms', 'bathrooms', 'amenities']
+    assert data['price'] == 120 and data['reviewCount'] == 80 and data['amenities'] == ['WiFi', 'Kitchen']
+    assert json.loads(json.dumps(data)) == data
+    print('✅ Records share defaults and serialize to the existing JSON shape')
+    return True
+
+def test_json_responses():
+    """Test that responses are written as compact UTF-8 JSON by the fast provider"""
+    print('\n📦 Testing JSON Response Encoding:')
+    payload = {'city': 'São Paulo', 'big': 2 ** 70, 'price': 120, 'nested': [{'rating': 4.5}]}
+    encoded = app.json.dumps_bytes(payload)
+    assert json.loads(encoded) == payload
+    assert 'São'.encode('utf-8') in encoded and b', ' not in encoded
+
+    with app.test_request_context():
+        response = jsonify(payload)
+    assert response.mimetype == 'application/json' and response.get_json() == payload
+    assert list(response.get_json()) == list(payload)  # Keys keep their order
+
+    stats = app.test_client().get('/api/v1/stats').get_json()['data']
+    print(f"✅ Responses encoded with {stats['jsonEncoder']}")
+    return True
+
+def test_streamed_listing_extraction():
+    """Test that RapidAPI listings are parsed from the streamed body and pruned to the fields we read"""
+    print('\n🌊 Testing Streamed Listing Extraction:')
+    from services.json_stream import iter_json_array, JSONArrayNotFound
+    app_module = sys.modules['app']
+    original_get = app_module.http_client.get
+    listing = {
+        'listing': {'id': '42', 'legacyName': 'Canal House', 'title': 'Home in Amsterdam', 'coordinate': {'lat': 52.37}},
+        'structuredDisplayPrice': {'primaryLine': {'price': '$180', 'qualifier': 'night'}, 'explanationData': {'x': 1}},
+        'avgRatingLocalized': '4.9 (210)',
+        'contextualPictures': [{'picture': 'https://example.com/42.jpg', 'caption': {'messages': ['Kitchen']}}],
+        'badges': [{'text': 'Guest favorite'}]
+    }
+    body = json.dumps({'status': True, 'data': {'paging': {'list': []}, 'list': [listing] * 3}, 'message': 'ok'}).encode()
+
+    app_module.http_client.get = lambda *args, **kwargs: StreamedResponse(body)
+    app_module.search_cache.clear()
+    try:
+        properties = call_airbnb_search('Amsterdam')
+        assert len(properties) == 3
+        assert 'badges' not in properties[0] and 'coordinate' not in properties[0]['listing']
+        assert properties[0]['structuredDisplayPrice'] == {'primaryLine': {'price': '$180'}}
+        record = transform_airbnb_properties(properties)[0]
+        assert (record.id, record.price, record.rating, record.image_url) == ('42', 180, 4.9, 'https://example.com/42.jpg')
+        print('✅ Listings decoded from 7-byte chunks with unused fields dropped')
+
+        app_module.http_client.get = lambda *args, **kwargs: StreamedResponse(b'{"status": false, "message": "bad"}')
+        assert call_airbnb_search('Vienna') == []
+        try:
+            list(iter_json_array([b'{"data": {}}'], ('data', 'list')))
+            assert False, "missing array should raise"
+        except JSONArrayNotFound:
+            print('✅ Responses without data.list are reported, not cached')
+    finally:
+        app_module.http_client.get = original_get
+        app_module.search_cache.clear()
+
+    return True
+
+def test_search_pipeline():
+    """Test that listings stream through the staged pipeline into a bounded top-k sink"""
+    print('\n🚰 Testing Search Pipeline:')
+    from services.pipeline import PipelineStats, TopKSink
+    prices = [(i * 37) % 23 + 50 for i in range(200)]
+    records = [Property.create(id=str(i), title=f'Stay {i}', price=price, rating=4.5, review_count=10,
+                               image_url='', location='Paris', url='', type='Apartment')
+               for i, price in enumerate(prices)]
+    for sort_by in ('price_asc', 'price_desc', None):
+        expected = sort_properties(list(records), {'sort_by': sort_by})[:15]
+        sink = ranking_sink({'sort_by': sort_by}, 15)
+        for record in records:
+            sink.append(record)
+        assert sink.results() == expected and sink.total == 200
+    assert TopKSink(limit=0).results() == [] and TopKSink().results() == []
+    print('✅ Top-k sink matches a stable sort, ties in arrival order')
+
+    raw = [raw_listing(i % 150, price, name=f'Stay {i}') for i, price in enumerate(prices)]
+    stats = PipelineStats()
+    sink = run_property_pipeline(iter(raw), PropertyFilter({'priceMax': 60}), ranking_sink({}, 5), stats)
+    summary = stats.summary()
+    assert list(summary) == ['fetch', 'dedupe', 'transform', 'filter', 'rank']
+    assert summary['fetch']['items'] == 200 and summary['dedupe']['items'] == 150
+    assert summary['rank']['items'] == sink.total == sum(1 for price in prices[:150] if price <= 60)
+    assert len(sink.results()) == 5
+    print(f"✅ Stages reported in order: {summary}")
+
+    with patched_search(lambda location: [dict(prop) for prop in raw]):
+        data = app.test_client().post('/api/v1/search', json={'query': 'cheapest places in paris'}).get_json()['data']
+        assert data['total'] == 150
+        assert list(data['stages']) == ['fetch', 'dedupe', 'transform', 'collect', 'filter']
+        assert data['stages']['collect']['items'] == data['stages']['filter']['items'] == 150
+        print('✅ Search responses include per-stage timings, filtered column by column')
+
+    return True
+
+def test_deadline_partial_results():
+    """Test that a search returns finished locations when its time budget runs out"""
+    print('\n⏳ Testing Deadline Propagation:')
+    app_module = sys.modules['app']
+    original_budget = app_module.SEARCH_REQUEST_BUDGET
+
+    def slow_in_paris(location):
+        if location == 'paris':
+            time.sleep(1)
+        return [raw_listing(f'{location}-1', name=location)]
+
+    app_module.SEARCH_REQUEST_BUDGET = 0.3
+    try:
+        with patched_search(slow_in_paris):
+            start = time.time()
+            response = app.test_client().post('/api/v1/search', json={'query': 'places in europe'})
+            elapsed = time.time() - start
+    finally:
+        app_module.SEARCH_REQUEST_BUDGET = original_budget
+
+    result = response.get_json()['data']
+    assert response.status_code == 200
+    assert result['partial'] is True
+    assert result['total'] == 4 and elapsed < 1
+    print(f'✅ Partial response in {elapsed:.2f}s with {result["total"]} of 5 locations')
+
+    return True
+
+def test_upstream_retries():
+    """Test that failed RapidAPI calls are retried, but never past the request budget"""
+    print('\n🔁 Testing Upstream Retries:')
+    app_module = sys.modules['app']
+    original_get = app_module.http_client.get
+    body = json.dumps({'data': {'list': [raw_listing('retry-1')]}}).encode()
+    attempts = []
+
+    def flaky_get(*args, **kwargs):
+        attempts.append(kwargs['read_timeout'])
+        if len(attempts) == 1:
+            raise requests.exceptions.ConnectionError('Connection reset by peer')
+        return StreamedResponse(body)
+
+    def unavailable_get(*args, **kwargs):
+        attempts.append(kwargs['read_timeout'])
+        return StreamedResponse(b'Service Unavailable', status_code=503)
+
+    app_module.http_client.get = flaky_get
+    app_module.search_cache.clear()
+    try:
+        assert [prop['listing']['id'] for prop in call_airbnb_search('Rome')] == ['retry-1']
+        assert len(attempts) == 2
+        print('✅ A dropped connection is retried and its listings returned')
+
+        attempts.clear()
+        app_module.http_client.get = unavailable_get
+        start = time.time()
+        assert call_airbnb_search('Berlin', deadline=Deadline(0.5)) == []
+        assert len(attempts) == 1 and time.time() - start < 0.5
+        print('✅ A 503 is not retried when the backoff would outlast the deadline')
+    finally:
+        app_module.http_client.get = original_get
+        app_module.search_cache.clear()
+        app_module.circuit_breaker.failure_count = 0
+
+    return True
+
+def test_hedged_calls():
+    """Test that slow RapidAPI calls are hedged within the budget and the breaker"""
+    print('\n🏎️ Testing Hedged Requests:')
+    from services.hedging import HedgedCaller
+    lock = threading.Lock()
+
+    def attempts(*behaviours):
+        """A call whose n-th attempt sleeps, then returns or raises behaviours[n]"""
+        started = []
+
+        def call():
+            with lock:
+                index = len(started)
+                started.append(index)
+            delay, outcome = behaviours[min(index, len(behaviours) - 1)]
+            time.sleep(delay)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        call.started = started
+        return call
+
+    hedger = HedgedCaller(default_delay=0.05, min_delay=0.01, budget_ratio=1.0, max_workers=4)
+    start = time.monotonic()
+    assert hedger.call(attempts((0.5, 'primary'), (0, 'hedge'))) == 'hedge'
+    assert time.monotonic() - start < 0.4
+    assert hedger.get_stats()['hedges'] == 1 and hedger.get_stats()['hedgeWins'] == 1
+    print('✅ Hedge sent after the delay and the faster attempt won')
+
+    hedger = HedgedCaller(default_delay=0.05, min_delay=0.01, budget_ratio=0.0, max_workers=4)
+    call = attempts((0.15, 'primary'), (0, 'hedge'))
+    assert hedger.call(call) == 'primary' and call.started == [0]
+    assert hedger.get_stats()['budgetDenied'] == 1 and hedger.get_stats()['hedges'] == 0
+    print('✅ Hedge denied once the budget has no tokens')
+
+    hedger = HedgedCaller(default_delay=0.05, min_delay=0.01, budget_ratio=1.0, max_workers=4)
+    call = attempts((0.15, 'primary'), (0, 'hedge'))
+    assert hedger.call(call, max_wait=0.05) == 'primary' and call.started == [0]
+    assert hedger.get_stats()['hedges'] == 0 and hedger.get_stats()['budgetDenied'] == 0
+    print('✅ No hedge when max_wait is within the hedge delay')
+
+    call = attempts((0.15, ValueError('primary failed')), (0, ValueError('hedge failed')))
+    try:
+        hedger.call(call)
+        assert False, "both attempts failing should raise"
+    except ValueError as e:
+        assert str(e) == 'primary failed' and call.started == [0, 1]
+    print('✅ Primary error raised when both attempts fail')
+
+    for state in ('OPEN', 'HALF_OPEN'):
+        breaker = CircuitBreaker(failure_threshold=1, half_open_max_calls=1)
+        if state == 'HALF_OPEN':
+            breaker.state = 'HALF_OPEN'
+            work = attempts((0.15, 'primary'), (0, 'hedge'))
+        else:
+            # The breaker trips while the primary is still in flight
+            def work(inner=attempts((0.15, 'primary'), (0, 'hedge'))):
+                breaker.record_failure()
+                return inner()
+        hedger = HedgedCaller(default_delay=0.05, min_delay=0.01, budget_ratio=1.0, max_workers=4)
+        assert hedger.call(lambda: breaker.call(work)) == 'primary'
+        assert hedger.get_stats()['hedges'] == 1 and hedger.get_stats()['hedgeWins'] == 0
+        print(f'✅ {state} breaker rejected the hedge, primary result returned')
+
+    return True
+
+def test_rate_limiter():
+    """Test early rejection by the token bucket and Retry-After handling"""
+    print('\n🚦 Testing Rate Limiter:')
+    import tempfile
+    from services.rate_limiter import (
+        RateLimitExceeded, SharedMonthlyUsage, SharedTokenBucket, TokenBucket, UpstreamRateLimiter
+    )
+
+    limiter = UpstreamRateLimiter(TokenBucket(rate=1, capacity=2), monthly_quota=100, max_wait=0)
+    limiter.acquire()
+    limiter.acquire()
+    try:
+        limiter.acquire()
+        assert False, "third call should exceed the burst"
+    except RateLimitExceeded as e:
+        print(f'✅ Rejected early: {e}')
+
+    limiter.update_from_response(429, {'Retry-After': '30', 'X-RateLimit-Requests-Remaining': '42'})
+    stats = limiter.get_stats()
+    assert stats['monthlyRemaining'] == 42 and stats['pausedFor'] > 29
+    print(f'✅ Remaining budget after 429: {stats}')
+
+    # Two gunicorn workers sharing one SQLite file share the bucket and the quota
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'limits.sqlite3')
+        workers = [
+            UpstreamRateLimiter(SharedTokenBucket(rate=0.001, capacity=10, path=path), monthly_quota=3, max_wait=0,
+                                usage=SharedMonthlyUsage(path))
+            for _ in range(2)
+        ]
+        workers[0].acquire()
+        workers[0].acquire()
+        workers[1].acquire()
+        for worker in workers:
+            stats = worker.get_stats()
+            assert stats['monthlyRemaining'] == 0 and round(stats['tokensAvailable']) == 7
+            try:
+                worker.acquire()
+                assert False, "the shared monthly quota is used up"
+            except RateLimitExceeded as e:
+                assert 'Monthly' in str(e)
+    print('✅ Workers sharing a SQLite file share the token bucket and the monthly quota')
+
     return True
 
 def test_data_transformer():
@@ -106,6 +907,39 @@ def test_location_extraction():
         locations = extract_multiple_locations_from_query(query)
         print(f'✅ Query: "{query}" -> Locations: {locations}')
     
+    # Keyword priority, phrase boundaries and the trailing-phrase fallback
+    assert extract_location_from_query('hotel in rome with a pool') == 'Rome With'
+    assert extract_location_from_query('somewhere warm. maybe miami, or orlando') == 'Maybe Miami, Or Orlando'
+    assert extract_location_from_query('family trip to new york, 4 guests, with parking') == 'New York, 4 Guests, With'
+    assert extract_location_from_query('Tokyo') == 'Tokyo'
+    assert extract_location_from_query('a nice room') == 'United States'
+    print('✅ Single-pass location extraction keeps the keyword-priority results')
+    
+    return True
+
+def test_query_analysis():
+    """Test the shared query analysis and the LLM fallback built on it"""
+    print('\n🧩 Testing Query Analysis:')
+    from services.query_parser import analyze_query
+    
+    parsed = analyze_query('Cheapest 3 bedroom villa in Europe with a pool')
+    assert parsed.region == 'europe'
+    assert parsed.locations == ('london', 'paris', 'barcelona', 'rome', 'amsterdam')
+    assert parsed.criteria == {'sort_by': 'price_asc', 'property_size': None, 'price_preference': 'budget'}
+    assert (parsed.bedrooms, parsed.guests, parsed.property_type) == (3, 6, 'villa')
+    assert parsed.amenities == ('pool',)
+    print(f'✅ One pass yields locations, criteria and fallback parameters: {parsed.locations}')
+    
+    # Cached by normalized query, so every extractor shares one analysis
+    assert analyze_query('  cheapest 3 BEDROOM villa in europe with a pool') is parsed
+    print('✅ Analysis is cached by normalized query')
+    
+    # Fallback aliases match whole words, so "place" no longer means Los Angeles
+    fallback = openrouter_service._fallback_query_processing('place in vegas for 4 people')
+    assert fallback['location'] == 'Las Vegas'
+    assert fallback['guests'] == 4
+    print(f'✅ LLM fallback uses the shared analysis: {fallback}')
+    
     return True
 
 def test_criteria_extraction():
@@ -134,13 +968,44 @@ def test_place_id_mapping():
         "NYC",
         "London",
         "Tokyo",
-        "Unknown City"
+        "Barcelna"
     ]
     
     for location in test_locations:
         place_id = get_place_id(location)
         print(f'✅ Location: "{location}" -> Place ID: {place_id[:20]}...')
     
+    # Exact names, aliases, embedded names and fragments resolve through the index
+    assert get_place_id('LA') == get_place_id('Los Angeles')
+    assert get_place_id('cheap stays in paris france') == get_place_id('Paris')
+    assert get_place_id('barcel') == get_place_id('Barcelona')
+    print('✅ Aliases, embedded names and fragments resolve via the location index')
+    
+    # Misspellings resolve by trigram similarity; unknown places are not guessed
+    assert get_place_id('amsterdm') == get_place_id('Amsterdam')
+    assert get_place_id('londn') == get_place_id('London')
+    assert get_place_id('Unknown City') is None
+    
+    # Countries and cities outside the gazetteer must not borrow a similar name
+    for location in ['austria', 'germany', 'france', 'porto', 'nice', 'seville']:
+        assert get_place_id(location) is None, location
+    
+    # Callers that don't pass a threshold get the same cutoff as get_place_id
+    from services.gazetteer import gazetteer
+    assert gazetteer.resolve('cheap stays in austria') is None and gazetteer.resolve('porto') is None
+    assert gazetteer.resolve('londn') == get_place_id('London')
+    
+    app_module = sys.modules['app']
+    original_get = app_module.http_client.get
+    upstream_calls = []
+    app_module.http_client.get = lambda *args, **kwargs: upstream_calls.append(args)
+    try:
+        assert call_airbnb_search('Unknown City') == []
+    finally:
+        app_module.http_client.get = original_get
+    assert upstream_calls == []
+    print('✅ Misspelled cities match fuzzily; unmatched locations skip the upstream call')
+    
     return True
 
 def main():
@@ -151,8 +1016,30 @@ def main():
     try:
         test_input_validation()
         test_circuit_breaker()
+        test_http_connection_pool()
+        test_search_result_cache()
+        test_shared_cache()
+        test_llm_query_cache()
+        test_request_coalescing()
+        test_async_fanout()
+        test_streaming_search()
+        test_speculative_ai_search()
+        test_combined_ai_search()
+        test_server_side_filters()
+        test_paginated_search()
+        test_location_collapsing_and_dedup()
+        test_property_batch()
+        test_property_records()
+        test_json_responses()
+        test_streamed_listing_extraction()
+        test_search_pipeline()
+        test_deadline_partial_results()
+        test_upstream_retries()
+        test_hedged_calls()
+        test_rate_limiter()
         test_data_transformer()
         test_location_extraction()
+        test_query_analysis()
         test_criteria_extraction()
         test_place_id_mapping()
         